@@ -0,0 +1,92 @@
+"""Compare path lookups by walking the collections with the path index"""
+#
+# Builds a /CVB collection of sketches, each laid out as the add-on
+# does it, then for every sketch looks up:
+#
+#   tail        collection_tail("/CVB/{name}/Sketch ~ {name}")
+#   object      path_object("/CVB/{name}/{name} Transform")
+#
+# and reports lookups per second walking from the root every time,
+# as before the index, then through the index cold (just cleared)
+# and warm.
+#
+# This needs a Blender scene, so run it inside Blender:
+#
+#     blender --background --factory-startup --python benchmarks/bench_collection_paths.py -- [--sketches 5000]
+#
+# Copyright (c) 2021 Keith Pinson
+
+import argparse
+import os
+import sys
+
+import bpy
+
+# Blender doesn't put the folder of a --python script on the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from bench_setup import timed
+from src.utils import collection_utils
+from src.utils.object_utils import object_get_or_add_empty
+
+
+def build_sketches(count):
+    """Return: the names of count sketches added to /CVB"""
+    names = ["City{0}_g1x1".format(n) for n in range(1, count + 1)]
+
+    for name in names:
+        collection_utils.collection_add("/CVB/{0}/Sketch ~ {0}".format(name))
+        object_get_or_add_empty("/CVB/{0}".format(name), "{0} Transform".format(name))
+
+    bpy.context.view_layer.update()
+
+    return names
+
+
+def rate(lookup, paths):
+    """Return: lookups per second, and the count of paths found"""
+
+    def look_up_all():
+        return sum(1 for path in paths if lookup(path) is not None)
+
+    found, seconds = timed(look_up_all)
+
+    return len(paths) / seconds, found
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sketches', type=int, default=5000, help='sketch collections to build')
+    args = parser.parse_args(argv)
+
+    names, seconds = timed(build_sketches, args.sketches)
+    print("built {:,} sketches in {:.2f}s".format(len(names), seconds))
+
+    # pylint: disable=protected-access
+    lookups = (
+        ("tail", "/CVB/{0}/Sketch ~ {0}",
+         collection_utils._walk_tail, collection_utils.collection_tail),
+        ("object", "/CVB/{0}/{0} Transform",
+         collection_utils._walk_path, collection_utils.path_object),
+    )
+
+    print("{:>10} {:>12} {:>12} {:>12} {:>7}".format("lookup", "walk/s", "cold/s", "warm/s", "found"))
+
+    for label, path_format, walk, indexed in lookups:
+        paths = [path_format.format(name) for name in names]
+
+        walk_rate, found = rate(walk, paths)
+
+        collection_utils.collection_index_clear()
+        cold_rate, _ = rate(indexed, paths)
+        warm_rate, indexed_found = rate(indexed, paths)
+
+        print("{:>10} {:>12,.0f} {:>12,.0f} {:>12,.0f} {:>7}".format(
+            label, walk_rate, cold_rate, warm_rate, "ok" if found == indexed_found == len(paths) else "MISSED"))
+
+
+if __name__ == "__main__":
+    main()
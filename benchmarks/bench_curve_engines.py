@@ -0,0 +1,128 @@
+"""Compare the space-filling curves that can number a region's tiles"""
+#
+# For each curve engine and region order this reports:
+#
+#   build       Seconds to build the lookup tables
+#   scalar/s    get_tile_xy() + get_tile_id() round trips per second
+#   batch/s     Tiles per second through get_tile_xy_many() + get_tile_id_many()
+#   step        Mean tile-space distance from one tile id to the next
+#   miss        Miss rate of an LRU of neighbor tile files, walking the tiles
+#               in id order and opening each tile with its 8 neighbors
+#
+# A step of 1.0 means the curve never jumps. The miss rate is closer
+# to what a batch job feels: how often it must load a neighbor's file
+# again because the curve wandered off and came back.
+#
+# Usage:
+#
+#     python benchmarks/bench_curve_engines.py [--orders 1-35] [--lru 32] [--engines fass,hilbert]
+#
+# Copyright (c) 2021 Keith Pinson
+
+import argparse
+from collections import OrderedDict
+
+import numpy as np
+
+from bench_setup import fass_grid, curve_engines, timed, parse_orders
+
+ENGINES = {
+    'fass': fass_grid.fassGrid,
+    'hilbert': curve_engines.HilbertCurve,
+    'zorder': curve_engines.ZOrderCurve,
+    'spiral': curve_engines.SquareSpiralCurve,
+}
+
+
+def scalar_rate(grid, samples=10_000):
+    """Return: scalar id -> xy -> id round trips per second"""
+    rng = np.random.default_rng(1)
+    tile_ids = rng.integers(0, grid.get_last_tile() + 1, samples).tolist()
+
+    def round_trips():
+        for tile_id in tile_ids:
+            grid.get_tile_id(*grid.get_tile_xy(tile_id))
+
+    _, seconds = timed(round_trips)
+
+    return samples / seconds
+
+
+def batch_rate(grid):
+    """Return: tiles per second through the batch id -> xy -> id round trip"""
+    tile_ids = np.arange(grid.get_last_tile() + 1)
+
+    _, seconds = timed(lambda: grid.get_tile_id_many(*grid.get_tile_xy_many(tile_ids)))
+
+    return len(tile_ids) / seconds
+
+
+def mean_step(grid):
+    """Return: mean tile-space distance between consecutive tile ids"""
+    steps = np.diff(grid.get_tile_to_xy_table().astype(np.float64), axis=0)
+
+    return float(np.hypot(steps[:, 0], steps[:, 1]).mean()) if len(steps) else 0.0
+
+
+def lru_miss_rate(grid, capacity):
+    """Return: miss rate of a capacity sized LRU of tile files when each tile,
+    in id order, is opened along with its 8 neighbors"""
+    tile_ids = np.arange(grid.get_last_tile() + 1)
+    touched = np.concatenate((tile_ids[:, None], grid.get_tile_neighbors_many(tile_ids, diagonal=True)), axis=1)
+
+    lru = OrderedDict()
+    misses = accesses = 0
+
+    for row in touched.tolist():
+        for tile_id in row:
+            if tile_id < 0:
+                continue
+
+            accesses += 1
+
+            if tile_id in lru:
+                lru.move_to_end(tile_id)
+            else:
+                misses += 1
+                lru[tile_id] = True
+
+                if len(lru) > capacity:
+                    lru.popitem(last=False)
+
+    return misses / accesses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', default="1-35", help='region orders, eg. "1-35" or "3,11,35"')
+    parser.add_argument('--lru', type=int, default=32, help='tile files kept open by the simulated LRU')
+    parser.add_argument('--engines', default=",".join(ENGINES), help='curve engines to compare')
+    args = parser.parse_args()
+
+    names = args.engines.split(",")
+
+    print("{:>5} {:>8} {:>9} {:>11} {:>12} {:>7} {:>7}".format(
+        "order", "engine", "build", "scalar/s", "batch/s", "step", "miss"))
+
+    totals = {name: [] for name in names}
+
+    for order in parse_orders(args.orders):
+        for name in names:
+            grid, build = timed(ENGINES[name], order)
+            step = mean_step(grid)
+            miss = lru_miss_rate(grid, args.lru)
+
+            totals[name].append((step, miss))
+
+            print("{:>5} {:>8} {:>8.4f}s {:>11,.0f} {:>12,.0f} {:>7.3f} {:>6.1%}".format(
+                order, name, build, scalar_rate(grid), batch_rate(grid), step, miss))
+
+    print()
+
+    for name, rows in totals.items():
+        steps, misses = zip(*rows)
+        print("{:>8}  mean step {:.3f}  mean miss {:.1%}".format(name, np.mean(steps), np.mean(misses)))
+
+
+if __name__ == "__main__":
+    main()
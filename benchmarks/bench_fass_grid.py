@@ -0,0 +1,137 @@
+"""Check fassGrid against its requirements at every region order"""
+#
+# Requirements 8 and 9 of fass_grid.py promise tile id -> x,y and
+# x,y -> tile id in under 300 ms. For every region order this times:
+#
+#   build       Building the grid from scratch (no table cache)
+#   xy          The slowest single get_tile_xy() call over every tile
+#   id          The slowest single get_tile_id() call over every tile
+#   batch       get_tile_xy_many() + get_tile_id_many() over every tile
+#
+# and checks that the grid is sound:
+#
+#   - there are (order*9)**2 tiles, tile 0 at 0,0
+#   - tile id <-> x,y is a bijection; no two tiles share a position,
+#     and every position maps back to the tile it came from
+#   - the batch lookups agree with the scalar ones
+#
+# Exits with 1 if any order breaks the budget or fails a check.
+#
+# Usage:
+#
+#     python benchmarks/bench_fass_grid.py [--orders 1-35] [--budget-ms 300]
+#
+# Copyright (c) 2021 Keith Pinson
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from bench_setup import fass_grid, timed, parse_orders
+
+
+def slowest_call(func, args):
+    """Return: results of func(*a) for a in args and the seconds of the slowest call"""
+    results = []
+    slowest = 0.0
+
+    for arg in args:
+        start = time.perf_counter()
+        results.append(func(*arg))
+        slowest = max(slowest, time.perf_counter() - start)
+
+    return results, slowest
+
+
+def soundness_errors(grid):
+    """Return: list of what is wrong with the grid's numbering"""
+    errors = []
+
+    order = grid.get_order()
+    count = grid.get_last_tile() + 1
+    tile_ids = np.arange(count)
+
+    tile_to_xy = np.asarray(grid.get_tile_to_xy_table())
+    left, top, right, bottom = grid.get_grid_corners()
+
+    if count != (order * 9) ** 2 or len(tile_to_xy) != count:
+        errors.append("{} tiles, expected {}".format(len(tile_to_xy), (order * 9) ** 2))
+
+    if grid.get_tile_xy(0) != (0, 0):
+        errors.append("tile 0 is at {}".format(grid.get_tile_xy(0)))
+
+    if len(np.unique(tile_to_xy, axis=0)) != len(tile_to_xy):
+        errors.append("tiles share positions")
+
+    xs, ys = tile_to_xy[:, 0], tile_to_xy[:, 1]
+
+    if ((xs < left) | (xs > right) | (ys < top) | (ys > bottom)).any():
+        errors.append("tiles outside the grid corners")
+
+    round_trip = grid.get_tile_id_many(xs, ys)
+
+    if (round_trip != tile_ids).any():
+        errors.append("{} tiles do not map back from x,y".format(int((round_trip != tile_ids).sum())))
+
+    batch_xs, batch_ys = grid.get_tile_xy_many(tile_ids)
+    scalar_xy = [grid.get_tile_xy(tile_id) for tile_id in range(count)]
+
+    if scalar_xy != list(zip(batch_xs.tolist(), batch_ys.tolist())):
+        errors.append("get_tile_xy_many() differs from get_tile_xy()")
+
+    scalar_ids = []
+
+    for x, y in scalar_xy:
+        try:
+            scalar_ids.append(grid.get_tile_id(x, y))
+        except KeyError:
+            scalar_ids.append(-1)
+
+    if scalar_ids != round_trip.tolist():
+        errors.append("get_tile_id_many() differs from get_tile_id()")
+
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', default="1-35", help='region orders, eg. "1-35" or "3,11,35"')
+    parser.add_argument('--budget-ms', type=float, default=300.0, help='time allowed for each measure')
+    args = parser.parse_args()
+
+    budget = args.budget_ms / 1000.0
+    failed = []
+
+    print("{:>5} {:>7} {:>10} {:>10} {:>10} {:>10}  {}".format(
+        "order", "tiles", "build", "xy", "id", "batch", "result"))
+
+    for order in parse_orders(args.orders):
+        grid, build = timed(fass_grid.fassGrid, order)
+
+        tile_ids = np.arange(grid.get_last_tile() + 1)
+        xy, slowest_xy = slowest_call(grid.get_tile_xy, [(tile_id,) for tile_id in tile_ids.tolist()])
+        _, slowest_id = slowest_call(grid.get_tile_id, xy)
+        _, batch = timed(lambda: grid.get_tile_id_many(*grid.get_tile_xy_many(tile_ids)))
+
+        problems = ["{} over budget".format(name) for name, seconds in
+                    (("build", build), ("xy", slowest_xy), ("id", slowest_id), ("batch", batch))
+                    if seconds > budget]
+        problems.extend(soundness_errors(grid))
+
+        if problems:
+            failed.append(order)
+
+        print("{:>5} {:>7} {:>8.2f}ms {:>8.3f}ms {:>8.3f}ms {:>8.2f}ms  {}".format(
+            order, len(tile_ids), build * 1000, slowest_xy * 1000, slowest_id * 1000, batch * 1000,
+            "; ".join(problems) if problems else "ok"))
+
+    print()
+    print("FAILED orders: {}".format(failed) if failed else "All orders within {:g} ms".format(args.budget_ms))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Compare clearing the selection by visiting every object with object_select_only()"""
+#
+# Builds a synthetic tile of empties in a collection of the scene,
+# selects a handful of them, then times making one object the only
+# one selected:
+#
+#   every object    select_set(False) on every object in bpy.data.objects,
+#                   as object_make_active() did, then select the one
+#   select only     object_select_only(), which only visits the objects
+#                   selected in the view layer
+#
+# This needs a Blender scene, so run it inside Blender:
+#
+#     blender --background --factory-startup --python benchmarks/bench_object_selection.py -- [--objects 100000]
+#
+# Copyright (c) 2021 Keith Pinson
+
+import argparse
+import os
+import sys
+
+import bpy
+
+# Blender doesn't put the folder of a --python script on the path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# pylint: disable=wrong-import-position
+from bench_setup import timed
+from src.utils.collection_utils import collection_add
+from src.utils.object_utils import object_add_many, object_select_only
+
+
+def build_tile(count):
+    """Return: count empties added to a collection of the scene"""
+    collection_add("/CVB/Bench/Props ~ Bench")
+
+    return object_add_many(
+        "/CVB/Bench/Props ~ Bench", [("Prop {0}".format(n), None) for n in range(count)])
+
+
+def select_some(objects, count=10):
+    """Select count objects spread over the tile"""
+    view_layer = bpy.context.view_layer
+
+    for obj in objects[::max(len(objects) // count, 1)][:count]:
+        obj.select_set(True, view_layer=view_layer)
+
+
+def every_object(target):
+    for obj in bpy.data.objects:
+        obj.select_set(False)
+
+    target.select_set(True)
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--objects', type=int, default=100_000, help='objects in the synthetic tile')
+    parser.add_argument('--repeat', type=int, default=5, help='times to make an object the only one selected')
+    args = parser.parse_args(argv)
+
+    objects, seconds = timed(build_tile, args.objects)
+    print("built {:,} objects in {:.2f}s".format(len(objects), seconds))
+
+    for label, select in (
+            ("every object", every_object),
+            ("select only", lambda target: object_select_only([target]))):
+        total = 0.0
+
+        for n in range(args.repeat):
+            select_some(objects)
+            _, seconds = timed(select, objects[n])
+            total += seconds
+
+        selected = list(bpy.context.view_layer.objects.selected)
+        check = "ok" if selected == [objects[args.repeat - 1]] else "WRONG SELECTION"
+
+        print("{:>12} {:>10.2f} ms {}".format(label, 1000 * total / args.repeat, check))
+
+
+if __name__ == "__main__":
+    main()
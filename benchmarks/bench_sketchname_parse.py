@@ -0,0 +1,117 @@
+"""Time parsing Sketch Name strings, as the panel does on every redraw"""
+#
+# The panel rebuilds its sketch list from the children of /CVB every
+# time it draws and every time the mouse passes over the sketch name
+# dropdown, parsing every name each time. This reports names parsed
+# per second:
+#
+#   re.match    The regex given as a string and compiled again on every call
+#   cold        parse_sketchname_string() with an empty cache
+#   warm        parse_sketchname_string() again over the same names
+#   SketchName  SketchName.string_to_sketchname(), warm
+#   parse_many  parse_many() into columns, warm
+#   build one   build_sketchname_string() a name at a time
+#   build_many  build_many() from the parse_many() columns
+#
+# Before timing, it checks that build_many() gives back every parsed
+# name other than the imports, which build to a sketch of their own.
+#
+# Usage:
+#
+#     python benchmarks/bench_sketchname_parse.py [--names 10000]
+#
+# Copyright (c) 2021 Keith Pinson
+
+import argparse
+import re
+
+import numpy as np
+
+from bench_setup import sketchname_parse, timed
+
+
+def sketch_names(count):
+    """Return: count distinct Sketch Name strings in the forms the panel sees"""
+    rng = np.random.default_rng(1)
+    names = []
+
+    for n in range(count):
+        seed, tile, variant = rng.integers(1, 1000), rng.integers(0, 99999), rng.integers(1, 4)
+        form = n % 4
+
+        if form == 0:
+            names.append("NewYork{}_g1x1.{:03d}".format(seed, n % 999 + 1))
+        elif form == 1:
+            names.append("TauCeti5#{}_g30Mx30M-{:05d}.{:03d}".format(seed, tile, variant))
+        elif form == 2:
+            names.append("Motown{}_m10x20-{:05d}".format(seed, tile))
+        else:
+            names.append("Import{}".format(n))
+
+    return names
+
+
+def check_round_trip(names):
+    """Raise AssertionError unless parse_many() then build_many() gives back the names"""
+    columns = sketchname_parse.parse_many(names)
+    built = sketchname_parse.build_many(columns)
+
+    for name, import_name, sketch_name in zip(names, columns['import_name'], built):
+        if not import_name:
+            assert sketch_name == name, "{} built back as {}".format(name, sketch_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--names', type=int, default=10_000, help='Sketch Name strings to parse')
+    args = parser.parse_args()
+
+    names = sketch_names(args.names)
+    check_round_trip(names)
+
+    rex = sketchname_parse._CVB_SKETCHNAME_REX.pattern  # pylint: disable=protected-access
+    parse = sketchname_parse.parse_sketchname_string
+
+    def uncompiled():
+        for name in names:
+            re.purge()  # Otherwise re's own small cache of compiled patterns hides the cost
+            re.match(rex, name).groups()
+
+    def parse_all():
+        for name in names:
+            parse(name)
+
+    def sketchname_all():
+        for name in names:
+            sketchname_parse.SketchName().string_to_sketchname(name)
+
+    parse.cache_clear()
+
+    _, seconds_re = timed(uncompiled)
+    _, seconds_cold = timed(parse_all)
+    _, seconds_warm = timed(parse_all)
+    _, seconds_sketch = timed(sketchname_all)
+
+    columns, seconds_parse_many = timed(sketchname_parse.parse_many, names)
+    records = [parse(name) for name in names]
+
+    def build_one_at_a_time():
+        for r in records:
+            sketchname_parse.build_sketchname_string(
+                r.city, r.seed, r.style, r.x, r.y, r.tile if r.tile >= 0 else "", r.variant, r.import_name)
+
+    _, seconds_build = timed(build_one_at_a_time)
+    _, seconds_build_many = timed(sketchname_parse.build_many, columns)
+
+    for label, seconds in (
+            ("re.match", seconds_re), ("cold", seconds_cold),
+            ("warm", seconds_warm), ("SketchName", seconds_sketch),
+            ("parse_many", seconds_parse_many), ("build one", seconds_build),
+            ("build_many", seconds_build_many)):
+        print("{:>10} {:>12,.0f} names/s".format(label, len(names) / seconds))
+
+    print(parse.cache_info())
+
+
+if __name__ == "__main__":
+    main()
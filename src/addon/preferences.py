@@ -13,6 +13,16 @@ from bpy.types import AddonPreferences
 from bpy.props import StringProperty, IntProperty
 from ..utils.icons import IconCollection
 
+# Callbacks, called with the new order, when the region order preference changes
+_CVB_REGION_ORDER_HOOKS = []
+
+
+def update_region_order(self, context):
+    # pylint: disable=unused-argument
+    """cvb_terrain_region_order update callback"""
+    for hook in _CVB_REGION_ORDER_HOOKS:
+        hook(self.cvb_terrain_region_order)
+
 
 class CVB_AddonPreferences(AddonPreferences):
     # pylint: disable=invalid-name
@@ -50,6 +60,7 @@ class CVB_AddonPreferences(AddonPreferences):
         min=1,
         max=35,
         default=11,
+        update=update_region_order,
     )
 
     def draw(self, context):
@@ -102,6 +113,18 @@ def cvb_addon_unregister():
         del CVB_AddonPreferences.cvb_icon_list
 
 
+def cvb_region_order_hook(hook):
+    """Have hook(order) called whenever the region order preference changes"""
+    if hook not in _CVB_REGION_ORDER_HOOKS:
+        _CVB_REGION_ORDER_HOOKS.append(hook)
+
+
+def cvb_region_order_unhook(hook):
+    """Stop calling hook(order) on region order changes"""
+    if hook in _CVB_REGION_ORDER_HOOKS:
+        _CVB_REGION_ORDER_HOOKS.remove(hook)
+
+
 def cvb_prefs(context):
     """Convenience function to get the add-on preferences object"""
     return context.preferences.addons['cityvilleburg'].preferences
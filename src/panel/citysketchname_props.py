@@ -20,6 +20,8 @@
 #
 # Copyright (c) 2021 Keith Pinson
 
+from bisect import bisect_right, insort
+
 import bpy
 from bpy.types import PropertyGroup
 from bpy.props import (
@@ -27,16 +29,300 @@ from bpy.props import (
 from ..utils import sketchname_parse
 from ..utils.collection_utils import collection_children
 
-# Globals needed by Blender
-_CVB_SKETCHNAME = sketchname_parse.SketchName()
-_CVB_SKETCH_LIST = []  # We can't guarantee list to be always accurate
-_CVB_SKETCH_NAME_ENUMS = []
-_CVB_SKETCH_NAME_ENUMS_NUM = 0
+_CVB_LAST_CHAR = chr(0x10FFFF)  # Sorts after any character a name may end in
+
+# Owner of the message bus subscriptions, for clearing them
+_CVB_MSGBUS_OWNER = object()
+
+# The SketchState of each scene, by scene pointer. Kept in the driver
+# namespace, which outlives a script reload, so a reload can pick up the
+# index of the sketches rather than parse and sort them all again; see
+# _sketch_list_adopt(). Bump the key if the index of SketchState changes.
+_CVB_SKETCH_STATES = bpy.app.driver_namespace.setdefault("cvb_sketch_states_1", {})
+
+# Scenes, by name, waiting on a refresh_sketch_list() from the timer,
+# and the counts of refreshes asked for, run and skipped as coalesced
+_CVB_REFRESH_PENDING = set()
+_CVB_REFRESH_COUNTS = {'requested': 0, 'refreshed': 0, 'skipped': 0}
+_CVB_REFRESH_INTERVAL = 1 / 60  # About one UI frame
+
+
+class SketchState:
+    """The sketches found in /CVB, and what the panel of a scene has made of them"""
+    #
+    # Blender needs the enums returned by sketch_name_items_callback() to
+    # stay referenced, hence they are kept here rather than rebuilt.
+    #
+    # The collections are shared by the scenes of a file, so the index of
+    # the sketches is shared by every state that has read the same children.
+    # A new state (a scene switched to, or a script reload) can then pick
+    # up the index of another rather than parse and sort every sketch.
+    #
+
+    # What index() makes, all that is carried over a script reload
+    _index_fields = ('children', 'sketch_list', 'variants', 'names', 'index_enums')
+
+    def __init__(self, scene_name=""):
+        self.scene_name = scene_name  # A pointer may be reused by a later scene, a name check guards it
+        self.sketchname = sketchname_parse.SketchName()
+        self.sketchname_key = None  # The panel properties sketchname was built from
+
+        self.sketch_list = []       # SketchNameRecords; we can't guarantee list to be always accurate
+        self.variants = {}          # The sorted variants by sketch name less the variant
+        self.children = None        # The /CVB children as last read
+        self.names = []             # The sorted sketch names
+        self.index_enums = []       # The enums of the sorted sketch names
+
+        self.enums = []             # The pending sketch name followed by index_enums
+        self.enums_num = 0
+        self.stale = True
+
+        self.mini_sketches = {}     # Is the sketch minimized, by the name of its Transform empty
+
+    def index(self, sketch_names):
+        """Parse and index the sketches found in /CVB"""
+
+        self.children = list(sketch_names)
+
+        for other in _CVB_SKETCH_STATES.values():
+            if other is not self and other.children == self.children:
+                self.sketch_list, self.variants = other.sketch_list, other.variants
+                self.names, self.index_enums = other.names, other.index_enums
+                return
+
+        sketches = [sketchname_parse.parse_sketchname_string(name) for name in sketch_names]
+        self.sketch_list = sorted((sk for sk in sketches if sk is not None), key=lambda sk: sk.sketch_name)
+
+        # The variants of each sketch name, by its name less the variant
+        self.variants = {}
+
+        for sk in self.sketch_list:
+            insort(self.variants.setdefault(sk.get_plain_sketch_name(), []), sk.variant)
+
+        # Enum 0 is reserved for the pending sketch name
+        self.names = [sk.sketch_name for sk in self.sketch_list]
+        self.index_enums = [
+            (sk.sketch_name, sk.sketch_name, "", number) for number, sk in enumerate(self.sketch_list, 1)]
+
+    def refresh(self):
+        """Read the /CVB children again if they may have changed, index them if they have"""
+
+        if self.stale:
+            self.stale = False
+
+            cvb_collections = collection_children("/CVB") or []
+
+            if cvb_collections != self.children:
+                self.index(cvb_collections)
+
+
+def sketch_state(scene=None):
+    """Return: the SketchState of the scene, by default the current scene"""
+
+    scene = scene if scene is not None else bpy.context.scene
+    key = scene.as_pointer()
+
+    state = _CVB_SKETCH_STATES.get(key)
+
+    if state is None or state.scene_name != scene.name:
+        state = _CVB_SKETCH_STATES[key] = SketchState(scene.name)
+
+    return state
 
 
-def is_sketch_list_empty():
+def is_sketch_list_empty(scene=None):
     """Check to see if any sketches"""
-    return len(_CVB_SKETCH_LIST) == 0
+
+    try:
+        scene = scene if scene is not None else bpy.context.scene
+    except AttributeError:
+        return True  # No scene while registering
+
+    return scene is None or len(sketch_state(scene).sketch_list) == 0
+
+
+def invalidate_sketch_list():
+    """Have the next refresh_sketch_list() of every scene read the /CVB children again"""
+    for state in _CVB_SKETCH_STATES.values():
+        state.stale = True
+
+
+def schedule_sketch_list_refresh(cvb):
+    """Refresh the sketch list of the scene in the next UI frame; a burst of
+    requests, such as from dragging a slider, results in one refresh"""
+
+    _CVB_REFRESH_COUNTS['requested'] += 1
+
+    if cvb.id_data.name in _CVB_REFRESH_PENDING:
+        _CVB_REFRESH_COUNTS['skipped'] += 1
+        return
+
+    _CVB_REFRESH_PENDING.add(cvb.id_data.name)
+
+    if not bpy.app.timers.is_registered(_scheduled_sketch_list_refresh):
+        bpy.app.timers.register(_scheduled_sketch_list_refresh, first_interval=_CVB_REFRESH_INTERVAL)
+
+
+def sketch_list_refresh_counts():
+    """Return: dict of the count of sketch list refreshes requested, refreshed and skipped"""
+    return dict(_CVB_REFRESH_COUNTS)
+
+
+def _scheduled_sketch_list_refresh():
+    """Timer; refresh the sketch lists of the pending scenes"""
+
+    # Take the pending scenes first, so a refresh that raises can't leave
+    # a scene pending and have every later request for it skipped
+    pending = sorted(_CVB_REFRESH_PENDING)
+    _CVB_REFRESH_PENDING.clear()
+
+    for scene_name in pending:
+        scene = bpy.data.scenes.get(scene_name)
+
+        if scene is not None:
+            scene.CVB.city_props.refresh_sketch_list(scene.CVB)
+            _CVB_REFRESH_COUNTS['refreshed'] += 1
+
+    # The panel was drawn when the properties changed, before this refresh
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+    return None  # Run once
+
+
+def _sketch_list_warm_up():
+    """Index the sketches for every scene before the panel needs them"""
+
+    try:
+        scenes = bpy.data.scenes
+    except AttributeError:
+        return  # No data while registering at startup, load_post will follow
+
+    for scene in scenes:
+        sketch_state(scene).refresh()
+
+
+def _sketch_list_adopt():
+    """Carry the index of the states made before a script reload over to new ones"""
+
+    for key, state in list(_CVB_SKETCH_STATES.items()):
+        if not isinstance(state, SketchState):
+            adopted = _CVB_SKETCH_STATES[key] = SketchState(getattr(state, 'scene_name', ""))
+
+            for field in SketchState._index_fields:
+                setattr(adopted, field, getattr(state, field, getattr(adopted, field)))
+
+
+def _sketch_list_prune():
+    """Drop the states of scenes that are gone"""
+
+    if len(_CVB_SKETCH_STATES) > len(bpy.data.scenes):
+        scenes = {scene.as_pointer() for scene in bpy.data.scenes}
+
+        for key in [key for key in _CVB_SKETCH_STATES if key not in scenes]:
+            del _CVB_SKETCH_STATES[key]
+
+
+#
+# The /CVB children are only read again after Blender reports collections
+# may have changed: on depsgraph updates touching collections (which
+# includes those made through the Python API), on loading a file, on undo
+# and redo, and on collection renames and relinks in the UI through the
+# message bus.
+# Likewise the minimized state of a sketch is only looked up again after
+# its Transform empty is updated.
+#
+
+@bpy.app.handlers.persistent
+def _sketch_list_depsgraph_update(scene, depsgraph):
+    # pylint: disable=unused-argument
+    if depsgraph.id_type_updated('COLLECTION'):
+        invalidate_sketch_list()
+
+    _sketch_list_prune()
+
+    # Forget the minimized state of Transform empties that may have been scaled
+    states = [state for state in _CVB_SKETCH_STATES.values() if state.mini_sketches]
+
+    if states:
+        object_names = [update.id.name for update in depsgraph.updates if isinstance(update.id, bpy.types.Object)]
+
+        for state in states:
+            for object_name in object_names:
+                state.mini_sketches.pop(object_name, None)
+
+
+@bpy.app.handlers.persistent
+def _sketch_list_load_post(dummy):
+    # pylint: disable=unused-argument
+
+    # The scenes of the last file are gone, as are the message bus
+    # subscriptions and the refresh timer (it is not persistent)
+    _CVB_SKETCH_STATES.clear()
+    _CVB_REFRESH_PENDING.clear()
+    _sketch_list_subscribe()
+
+    _sketch_list_warm_up()
+
+
+@bpy.app.handlers.persistent
+def _sketch_list_undo_redo(dummy):
+    # pylint: disable=unused-argument
+
+    # Undo and redo bring back the collections and Transform empties of
+    # another step without a depsgraph update to say which changed
+    invalidate_sketch_list()
+
+    for state in _CVB_SKETCH_STATES.values():
+        state.mini_sketches.clear()
+
+    for scene in bpy.data.scenes:
+        schedule_sketch_list_refresh(scene.CVB)
+
+
+def _sketch_list_subscribe():
+    bpy.msgbus.clear_by_owner(_CVB_MSGBUS_OWNER)
+
+    for key in ((bpy.types.Collection, "name"), (bpy.types.Collection, "children")):
+        bpy.msgbus.subscribe_rna(
+            key=key, owner=_CVB_MSGBUS_OWNER, args=(), notify=invalidate_sketch_list)
+
+
+def cvb_sketch_list_register():
+    """Watch for changes to the sketches in /CVB"""
+    bpy.app.handlers.depsgraph_update_post.append(_sketch_list_depsgraph_update)
+    bpy.app.handlers.load_post.append(_sketch_list_load_post)
+    bpy.app.handlers.undo_post.append(_sketch_list_undo_redo)
+    bpy.app.handlers.redo_post.append(_sketch_list_undo_redo)
+    _sketch_list_subscribe()
+
+    # When reloading scripts, have the sketches ready for the first draw
+    _sketch_list_adopt()
+    _sketch_list_warm_up()
+
+
+def cvb_sketch_list_unregister():
+    """Stop watching for changes to the sketches in /CVB"""
+    bpy.msgbus.clear_by_owner(_CVB_MSGBUS_OWNER)
+
+    for handlers, handler in (
+            (bpy.app.handlers.depsgraph_update_post, _sketch_list_depsgraph_update),
+            (bpy.app.handlers.load_post, _sketch_list_load_post),
+            (bpy.app.handlers.undo_post, _sketch_list_undo_redo),
+            (bpy.app.handlers.redo_post, _sketch_list_undo_redo)):
+        if handler in handlers:
+            handlers.remove(handler)
+
+    if bpy.app.timers.is_registered(_scheduled_sketch_list_refresh):
+        bpy.app.timers.unregister(_scheduled_sketch_list_refresh)
+
+    _CVB_REFRESH_PENDING.clear()
+
+    # The states are kept for a script reload (see _sketch_list_adopt()), but
+    # the sketches may change while unregistered, so read them again after
+    invalidate_sketch_list()
 
 
 class CVB_CityNameProperties(PropertyGroup):
@@ -70,14 +356,15 @@ class CVB_CityNameProperties(PropertyGroup):
     def get_sketch_name(self):
 
         sketch_name = "[City1_g1x1]"
+        state = sketch_state(self.id_data)
 
-        if _CVB_SKETCH_NAME_ENUMS:
-            pending_name = _CVB_SKETCH_NAME_ENUMS[0][1]
-            selected_name = _CVB_SKETCHNAME.sketch_name
+        if state.enums:
+            pending_name = state.enums[0][1]
+            selected_name = state.sketchname.sketch_name
 
             sketch_name = pending_name \
                 if pending_name == "[" + selected_name + "]" \
-                else _CVB_SKETCH_NAME_ENUMS[_CVB_SKETCH_NAME_ENUMS_NUM][1]
+                else state.enums[state.enums_num][1]
 
         return sketch_name
 
@@ -94,85 +381,67 @@ class CVB_CityNameProperties(PropertyGroup):
         """Rebuild sketch name strings by pulling from the Blender Collections"""
         # Currently this is called everytime the panel draws()
 
-        # We are going to refresh 3 global variables
-        global _CVB_SKETCH_LIST, _CVB_SKETCH_NAME_ENUMS, _CVB_SKETCH_NAME_ENUMS_NUM
+        # We are going to refresh the scene's sketch state
+        state = sketch_state(cvb.id_data)
 
         #
         # 1. Refresh the list of sketches found in the Outliner of
         #    the Blender Collections
         #
-        # We assume the user may have deleted something, so start from scratch
-        _CVB_SKETCH_LIST.clear()
-
-        # Get the sketchname collection
-        cvb_collections = collection_children("/CVB")
-
-        if cvb_collections:
-
-            for sketch_name in cvb_collections:
-                sketch = sketchname_parse.SketchName()
-
-                sketch.string_to_sketchname(sketch_name)
-
-                _CVB_SKETCH_LIST.append(sketch)
+        # The user may have deleted something, but only once collections have
+        # changed (see invalidate_sketch_list()) are the children read again,
+        # and only if the children differ are they indexed again
+        state.refresh()
 
         #
-        # 2. Fill enums -- We assume the _CVB_SKETCH_LIST
-        #                  is current and correct
-        #
-        enums = []
-        enum_number = 1
-
-        for s in _CVB_SKETCH_LIST:
-            if hasattr(s, "sketch_name"):
-                enums.append((s.sketch_name, s.sketch_name, "", enum_number))
-                enum_number += 1
-
-        enums.sort()
-
+        # 2. Fill enums -- The sketches were sorted by name when indexed
         #
         # 3. Insert the pending sketch name that may be added
         #
-        # if(len(sketches_found) == imports_found)
         pending_sketch_name = cvb.city_props.sketch_name_with_no_variant(cvb)
 
-        sketches_found = [sk for sk in _CVB_SKETCH_LIST if sk.sketch_name.startswith(pending_sketch_name)]
+        sketches_found = pending_sketch_name in state.variants
 
-        # Insert the pending first, marked with brackets
+        # Insert the pending first, marked with brackets, then number the enums
         pending_display_name = "[" + pending_sketch_name + "]"
-        enums.insert(
-            0,
-            (pending_sketch_name, pending_display_name, "Press + to generate sketch", 0))
 
-        # Renumber the enums
-        for i in range(len(enums)):
-            enums[i] = (enums[i][0], enums[i][1], enums[i][2], i)
-
-        _CVB_SKETCH_NAME_ENUMS.clear()
-        _CVB_SKETCH_NAME_ENUMS.extend(enums)
+        state.enums.clear()
+        state.enums.append(
+            (pending_sketch_name, pending_display_name, "Press + to generate sketch", 0))
+        state.enums.extend(state.index_enums)
 
         #
         # 4. Adjust the default enum to match the props
         #
         if sketches_found:
-            ids_found = \
-                [item[3] for item in _CVB_SKETCH_NAME_ENUMS if item[0].startswith(_CVB_SKETCHNAME.sketch_name)]
-#                [item[3] for item in _CVB_SKETCH_NAME_ENUMS if item[0].startswith(pending_sketch_name)]
+            # The last of the enums starting with the sketch name
+            selected_name = state.sketchname.sketch_name
+            last = bisect_right(state.names, selected_name + _CVB_LAST_CHAR)
 
-            if(ids_found):
-                _CVB_SKETCH_NAME_ENUMS_NUM = ids_found[-1:].pop()  # Use the last found
+            if last > 0 and state.names[last - 1].startswith(selected_name):
+                state.enums_num = last  # Enum 0 is the pending sketch name
+            elif pending_sketch_name.startswith(selected_name):
+                state.enums_num = 0
 
         else:
-            _CVB_SKETCH_NAME_ENUMS_NUM = 0
+            state.enums_num = 0
 
     def refresh_sketch_name(self, cvb):
         """Set the current sketch name"""
 
-        global _CVB_SKETCHNAME
-        del _CVB_SKETCHNAME
-        _CVB_SKETCHNAME = self.sketchname(cvb)
+        state = sketch_state(cvb.id_data)
 
-        # print(_CVB_SKETCHNAME.to_json())
+        # Called on every draw, so only build it again if the properties changed
+        props = self._get_properties(cvb)
+        key = tuple(props.values()) + (cvb.encode_style(props['style']),)
+
+        if key == state.sketchname_key:
+            return
+
+        state.sketchname = self.sketchname(cvb)
+        state.sketchname_key = key
+
+        # print(state.sketchname.to_json())
 
     def set_sketch_name(self, value):
         return
@@ -187,10 +456,8 @@ class CVB_CityNameProperties(PropertyGroup):
         cvb = context.scene.CVB
         cvb.city_props.refresh_sketch_list(cvb)
 
-        # We assume the global vars are upto date
-        global _CVB_SKETCH_NAME_ENUMS
-
-        return _CVB_SKETCH_NAME_ENUMS
+        # We assume the sketch state is upto date
+        return sketch_state(context.scene).enums
 
     def sketch_name_with_next_variant(self, cvb):
         """Find the last variant value and increment it"""
@@ -199,13 +466,10 @@ class CVB_CityNameProperties(PropertyGroup):
 
         last_variant = 0
 
-        variances_found = \
-            [sk.variant for sk in _CVB_SKETCH_LIST if sk.sketch_name.startswith(plain_sketch_name)]
+        variances_found = sketch_state(cvb.id_data).variants.get(plain_sketch_name)
 
         if variances_found:
-            variances_found.sort()
-
-            last_variant = variances_found[-1:].pop()
+            last_variant = variances_found[-1]  # Kept sorted
 
         try:
             new_variant = int(last_variant) + 1
@@ -281,8 +545,8 @@ class CVB_CityNameProperties(PropertyGroup):
         if len(name) < 1:
             name = "city"
 
-        global _CVB_SKETCH_NAME_ENUMS, _CVB_SKETCH_NAME_ENUMS_NUM
-        current_sketch_name = _CVB_SKETCH_NAME_ENUMS[_CVB_SKETCH_NAME_ENUMS_NUM][0]
+        state = sketch_state(cvb.id_data)
+        current_sketch_name = state.enums[state.enums_num][0]
 
         self.refresh_sketch_name(cvb)
 
@@ -293,13 +557,13 @@ class CVB_CityNameProperties(PropertyGroup):
         cvb = context.scene.CVB if context else bpy.context.scene.CVB
 
         this_name = cvb.city_props.sketch_name_enum_prop
+        state = sketch_state(cvb.id_data)
 
         #
         # Set selected enum number
         #
-        global _CVB_SKETCH_NAME_ENUMS_NUM
-        _CVB_SKETCH_NAME_ENUMS_NUM = \
-            [item[3] for item in _CVB_SKETCH_NAME_ENUMS if item[0] == this_name].pop()
+        state.enums_num = \
+            [item[3] for item in state.enums if item[0] == this_name].pop()
 
         #
         # Make sure the visibility settings are correct
@@ -310,15 +574,18 @@ class CVB_CityNameProperties(PropertyGroup):
         #
         # Update panel properties based on sketchname
         #
-        sketches = [sk for sk in _CVB_SKETCH_LIST if sk.sketch_name == this_name]
+        sketches = [sk for sk in state.sketch_list if sk.sketch_name == this_name]
 
         sketch = sketches[0] if sketches else None
 
         if not sketch:
             # Derive the sketch from the sketch name
-            sketch = _CVB_SKETCHNAME
+            sketch = state.sketchname
             sketch.string_to_sketchname(this_name)
 
+            # No longer matches the properties it was built from
+            state.sketchname_key = None
+
         if sketch:
             if len(sketch.import_name) > 0:
                 cvb.city_props.city_panel_header_prop = "Cityvilleburg – Import"
@@ -10,6 +10,7 @@ from ..utils.collection_utils import collection_add
 from ..utils.object_utils import\
     object_add, object_get_or_add_empty, object_parent_all, object_make_active
 from ..citySketch import sketch_object
+from .citysketchname_props import invalidate_sketch_list
 
 
 class CVB_OT_NewSketchButton(Operator):
@@ -64,7 +65,9 @@ class CVB_OT_NewSketchButton(Operator):
         sketch_path_and_name = sketch_path + "/" + sketch_name
         object_make_active(sketch_path_and_name)
 
-        # Refresh the list after we've done everything
+        # Refresh the list after we've done everything; the depsgraph
+        # has yet to report the new collections
+        invalidate_sketch_list()
         cvb.city_props.refresh_sketch_list(cvb)
 
         cvb.city_props.update_city_name_prop(context)
@@ -21,11 +21,18 @@ from bpy.props import (
 # pylint: disable=relative-beyond-top-level
 from ..terrain.terrain_props import CVB_TerrainProperties
 from .citysketchname_props import CVB_CityNameProperties, is_sketch_list_empty
+from .citysketchname_props import cvb_sketch_list_register, cvb_sketch_list_unregister
+from .citysketchname_props import schedule_sketch_list_refresh, sketch_state
 from ..utils.collection_utils import viewlayer_collections, collection_sibling_names
-from ..utils.object_utils import object_get, object_get_or_add_empty, object_parent_all
-from ..utils.fass_grid import fassGrid
+from ..utils.collection_utils import collection_index_register, collection_index_unregister
+from ..utils.object_utils import object_get, object_get_or_add_empty, object_parent_all, object_set_matrices
+from ..utils.fass_grid import fass_grid_for_order, fass_preferred_order
+from ..utils.material_utils import material_pool_register, material_pool_unregister
 
-from ..addon.preferences import cvb_icon, cvb_prefs
+from ..addon.preferences import cvb_icon, cvb_prefs, cvb_region_order_hook, cvb_region_order_unhook
+
+# The tile id range can't follow the region order, so allow the largest region (order 35)
+_MAX_TILE_ID = (35 * 9) ** 2 - 1
 
 
 def _mini_factor(t, n):
@@ -46,7 +53,8 @@ class CVB_PanelProperties(PropertyGroup):
     # pylint: disable=invalid-name, line-too-long
     """Panel properties saved to the blend file"""
 
-    _grid = fassGrid()
+    # Switched by use_region_order() when the region order preference changes
+    _grid = fass_grid_for_order(fass_preferred_order())
 
     def decode_style(self, coded_style):
 
@@ -76,14 +84,38 @@ class CVB_PanelProperties(PropertyGroup):
             else ""
 
         if sketch_name:
+            # Called on every draw, so look only once until the empty changes
+            mini_sketches = sketch_state(cvb.id_data).mini_sketches
+            empty_name = "{0} Transform".format(sketch_name)
+
+            if empty_name in mini_sketches:
+                return mini_sketches[empty_name]
+
             # Get the empty
-            transform_object = object_get("/CVB/{0}/{0} Transform".format(sketch_name))
+            transform_object = object_get("/CVB/{0}/{1}".format(sketch_name, empty_name))
 
             if transform_object and hasattr(transform_object, "scale") and transform_object.scale:
                 is_full = isclose(1.0, transform_object.scale[0], abs_tol=0.0001)
 
+            mini_sketches[empty_name] = not is_full
+
         return not is_full
 
+    @classmethod
+    def use_region_order(cls, order):
+        """Switch to the grid of the region order"""
+        cls._grid = fass_grid_for_order(order)
+
+        try:
+            scenes = bpy.data.scenes
+        except AttributeError:
+            return  # No data while registering at startup
+
+        # The tile of every scene may now be out of the region or elsewhere in it
+        for scene in scenes:
+            scene.CVB.show_tile_position(scene.CVB)
+            schedule_sketch_list_refresh(scene.CVB)
+
     def mini_sketch_add_or_toggle(self, is_mini=True):
         """Adds or modifies the Transform empty to change the size of the sketch"""
 
@@ -131,7 +163,8 @@ class CVB_PanelProperties(PropertyGroup):
         #
         # 2. Center to Tile Zero
         #
-        tile_position = 0 if is_mini else cvb.tile_id_prop
+        # Only a multi-file render is placed on its tile, any other sketch is at tile zero
+        tile_position = cvb.tile_id_prop if cvb.using_tile_id_prop and not is_mini else 0
         self.move_tile_position(empty, tile_position)
 
         #
@@ -152,11 +185,23 @@ class CVB_PanelProperties(PropertyGroup):
             if empty:
                 empty.scale = (1, 1, 1)
 
+        # The depsgraph has yet to report the empties scaled
+        sketch_state(cvb.id_data).mini_sketches.clear()
+
     def move_tile_position(self, empty, tile_id):
+        """Place the Transform empty on the tile, keeping its scale"""
 
         if empty:
-            # TODO: Get position based off tile_id
-            pass
+            matrices = self._grid.get_tile_matrices([tile_id], self.tile_size(), scale=empty.scale[0])
+            object_set_matrices([empty], matrices)
+
+    def move_tile_positions(self, sketch_names, tile_ids, scale=1.0):
+        """Place the Transform empties of many sketches on their tiles in one pass"""
+
+        empties = [bpy.data.objects.get("{0} Transform".format(sketch_name)) for sketch_name in sketch_names]
+        matrices = self._grid.get_tile_matrices(tile_ids, self.tile_size(), scale=scale)
+
+        object_set_matrices(empties, matrices)
 
     def parent_to_sketch(self, sketch_name):
 
@@ -198,16 +243,22 @@ class CVB_PanelProperties(PropertyGroup):
             if scene:
                 scene.exclude = not is_visible
 
+    def tile_size(self):
+        """Return: x, y size of a tile in meters"""
+
+        return (self.sketch_xy_linked_prop, self.sketch_xy_linked_prop) if \
+            self.using_tile_id_prop else (self.sketch_x_prop, self.sketch_y_prop)
+
     def update_seed(self, context):
         """Seed update"""
         cvb = context.scene.CVB
-        cvb.city_props.refresh_sketch_list(cvb)
+        schedule_sketch_list_refresh(cvb)
         self.set_seed(cvb.seed_prop)
 
     def update_sketch_style(self, context):
         """Sketch style update"""
         cvb = context.scene.CVB
-        cvb.city_props.refresh_sketch_list(cvb)
+        schedule_sketch_list_refresh(cvb)
 
     def update_sketch_visibility(self, context):
         """Toggle visibility of sketch layer"""
@@ -217,27 +268,37 @@ class CVB_PanelProperties(PropertyGroup):
     def update_sketch_xy_linked(self, context):
         """Sketch xy linked update"""
         cvb = context.scene.CVB
-        cvb.city_props.refresh_sketch_list(cvb)
+        schedule_sketch_list_refresh(cvb)
 
     def update_sketch_x(self, context):
         """Sketch x update"""
         cvb = context.scene.CVB
-        cvb.city_props.refresh_sketch_list(cvb)
+        schedule_sketch_list_refresh(cvb)
 
     def update_sketch_y(self, context):
         """Sketch y update"""
         cvb = context.scene.CVB
-        cvb.city_props.refresh_sketch_list(cvb)
+        schedule_sketch_list_refresh(cvb)
+
+    def show_tile_position(self, cvb):
+        """Keep the tile id inside the region and show the position of its tile"""
+
+        # Keep the tile inside the region; update_tile_id() is called again with the new id
+        if cvb.tile_id_prop > self._grid.get_last_tile():
+            cvb.tile_id_prop = self._grid.get_last_tile()
 
-    def update_tile_id(self, context):
-        """Impacts the file name """
-        cvb = context.scene.CVB
         (x,y)  = self._grid.get_tile_xy(cvb.tile_id_prop)
         # Default font bfont.ttf (DejaVu Sans) use of hyphen represents minus sign poorly
         coords = "{0:+04d} {1:+04d}".format(x,y)
         coords = coords.replace("-", "\u2212")  # replace hyphen with minus sign
         cvb.tile_position_prop = coords
-        cvb.city_props.refresh_sketch_list(cvb)
+
+    def update_tile_id(self, context):
+        """Impacts the file name """
+        cvb = context.scene.CVB
+
+        self.show_tile_position(cvb)
+        schedule_sketch_list_refresh(cvb)
 
     # def update_tile_position(self, context):
     #     """Translation of tile id to position"""
@@ -319,7 +380,7 @@ class CVB_PanelProperties(PropertyGroup):
     tile_id_prop: IntProperty(
         name="",
         description="""Unique ID of tile""",
-        default=0, min=0, max=_grid.get_last_tile(),
+        default=0, min=0, max=_MAX_TILE_ID,
         update=update_tile_id)
 
     tile_position_prop: StringProperty(
@@ -364,9 +425,21 @@ def cvb_panel_register():
     bpy.types.Scene.CVB = PointerProperty(name='CVB', type=CVB_PanelProperties)
     # pylint: enable=assignment-from-no-return
 
+    CVB_PanelProperties.use_region_order(fass_preferred_order())
+    cvb_region_order_hook(CVB_PanelProperties.use_region_order)
+
+    collection_index_register()
+    material_pool_register()
+    cvb_sketch_list_register()
+
 
 def cvb_panel_unregister():
     """Panel properties for unregistering"""
+    cvb_sketch_list_unregister()
+    material_pool_unregister()
+    collection_index_unregister()
+    cvb_region_order_unhook(CVB_PanelProperties.use_region_order)
+
     if bpy.types.Scene.CVB is not None:
         del bpy.types.Scene.CVB
 
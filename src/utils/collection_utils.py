@@ -41,8 +41,14 @@ folders and objects are like files"""
 
 
 import re
+from collections import deque
+from functools import lru_cache
+
 import bpy
 
+# Path lookups already walked, see _indexed()
+_CVB_PATH_INDEX = {}
+
 
 #    CVB
 #        city1_g1x1.001
@@ -55,7 +61,93 @@ import bpy
 
 def extract_path(path_string):
     """Convert a path string to a list of names"""
-    return re.findall(r"[^/\\]+", path_string)
+    return list(_extract_path(path_string))
+
+
+@lru_cache(maxsize=4096)
+def _extract_path(path_string):
+    return tuple(re.findall(r"[^/\\]+", path_string))
+
+
+#
+# Path index
+#
+# Walking a path from the root on every lookup adds up; the panel looks up
+# the same few paths on every draw. So what a walk finds is kept, by path,
+# and handed back as long as it is still valid: not removed (Blender then
+# raises ReferenceError) and not renamed. Anything else that may change
+# where a path leads, such as collections linked or unlinked, clears the
+# whole index; depsgraph updates to collections or scenes, loading a file,
+# undo and redo (which rebuild every ID), and the routines here that add
+# or remove collections.
+#
+# Only what was found is kept; a path not found is walked again each time.
+# Only IDs are kept; a view layer's LayerCollections are not IDs and
+# don't raise ReferenceError once freed, so they are always walked.
+#
+
+def _indexed(kind, path_string, walk):
+    """Return: walk(path_string), from the index if still valid"""
+
+    key = (kind, path_string)
+    entry = _CVB_PATH_INDEX.get(key)
+
+    if entry is not None:
+        found, name = entry
+
+        try:
+            if found.name == name:
+                return found
+        except ReferenceError:
+            pass
+
+    found = walk(path_string)
+
+    if found is not None:
+        _CVB_PATH_INDEX[key] = (found, found.name)
+    else:
+        _CVB_PATH_INDEX.pop(key, None)
+
+    return found
+
+
+def collection_index_clear():
+    """Forget every path found, they will be walked again"""
+    _CVB_PATH_INDEX.clear()
+
+
+@bpy.app.handlers.persistent
+def _collection_index_depsgraph_update(scene, depsgraph):
+    # pylint: disable=unused-argument
+    if _CVB_PATH_INDEX and (depsgraph.id_type_updated('COLLECTION') or depsgraph.id_type_updated('SCENE')):
+        collection_index_clear()
+
+
+@bpy.app.handlers.persistent
+def _collection_index_reset(dummy):
+    # pylint: disable=unused-argument
+    collection_index_clear()
+
+
+def collection_index_register():
+    """Keep the path index in step with Blender"""
+    bpy.app.handlers.depsgraph_update_post.append(_collection_index_depsgraph_update)
+
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(_collection_index_reset)
+
+
+def collection_index_unregister():
+    """Stop keeping the path index"""
+    for handlers, handler in (
+            (bpy.app.handlers.depsgraph_update_post, _collection_index_depsgraph_update),
+            (bpy.app.handlers.load_post, _collection_index_reset),
+            (bpy.app.handlers.undo_post, _collection_index_reset),
+            (bpy.app.handlers.redo_post, _collection_index_reset)):
+        if handler in handlers:
+            handlers.remove(handler)
+
+    collection_index_clear()
 
 
 def is_path_terminated(path_string):
@@ -151,13 +243,211 @@ def collection_add(path_string):
             coll = new_collection_node(path_string, i)
             part_added = parts[i]
 
+    if part_added:
+        collection_index_clear()
+
     return part_added
 
 
+def collection_add_tree(spec, path_string="/"):
+    """Add a tree of collections in one pass, return the paths added"""
+    #
+    # The spec nests dicts of collection names to their children (or
+    # None), eg. sketch_collection_spec(). The tree is added below the
+    # path, by default at the root. Collections found along the way are
+    # kept and their missing children added.
+    #
+    # As with collection_add(), a name already taken by a collection
+    # elsewhere fails, rather than Blender renaming it. That part of the
+    # tree is skipped.
+    #
+
+    paths_added = []
+
+    parts = extract_path(path_string)
+    parent = collection_tail("/" + "/".join(parts) + "/") if parts else None
+
+    if parts and parent is None:
+        return paths_added
+
+    root_children = bpy.context.scene.collection.children
+
+    # Collections to visit, each with the collection it goes in (None is the root)
+    pending = deque([(parent, "/".join([""] + parts), spec)])
+
+    while pending:
+        parent, parent_path, children = pending.popleft()
+
+        for name, grand_children in (children or {}).items():
+            path = parent_path + "/" + name
+
+            if parent is None:
+                coll = bpy.data.collections.get(name)
+            else:
+                coll = parent.children.get(name)
+
+            if coll is None:
+                if name in bpy.data.collections:
+                    print("Collection name already taken:", path)
+                    continue
+
+                # Keep new and link paired
+                coll = bpy.data.collections.new(name)
+                (root_children if parent is None else parent.children).link(coll)
+
+                paths_added.append(path)
+
+            if grand_children:
+                pending.append((coll, path, grand_children))
+
+    if paths_added:
+        collection_index_clear()
+
+    return paths_added
+
+
 def collection_remove(path_string):
     """Remove the collection; will not remove root"""
-    # TODO: Finish collection_remove()
-    print(path_string)
+    #
+    # Everything below the collection goes with it: its descendant
+    # collections, their objects and the meshes of those objects, all
+    # removed with one bpy.data.batch_remove(). Descendant collections
+    # also linked to a collection or scene outside are kept, and so is
+    # everything below them. Objects also linked to a collection not
+    # removed, and meshes also used by an object not removed, are left
+    # alone.
+    #
+    # Returns the counts of the collections, objects and meshes freed,
+    # and of the collections kept.
+    #
+
+    freed = {'collections': 0, 'objects': 0, 'meshes': 0, 'kept': 0}
+
+    if len(extract_path(path_string)) < 2:
+        return freed
+
+    coll = _indexed('path', path_string, _walk_path)
+
+    if coll is None or isinstance(coll, bpy.types.Object):
+        return freed
+
+    # Every link to a collection is a user of it, so a descendant with
+    # more users than links from within the subtree has a parent outside
+    subtree, parent_links = [coll], {}
+
+    for branch in subtree:
+        for child in branch.children:
+            if child not in parent_links:
+                parent_links[child] = 0
+                subtree.append(child)
+
+            parent_links[child] += 1
+
+    kept = [child for child, links in parent_links.items() if child.users > links]
+    keeping = set(kept)
+
+    for branch in kept:
+        for child in branch.children:
+            if child not in keeping:
+                keeping.add(child)
+                kept.append(child)
+
+    collections = [branch for branch in subtree if branch not in keeping]
+    removing = set(collections)
+
+    objects = {
+        obj for branch in collections for obj in branch.objects
+        if all(user in removing for user in obj.users_collection)}
+
+    # Meshes whose every user is going
+    mesh_users = {}
+
+    for obj in objects:
+        if obj.type == 'MESH' and obj.data is not None:
+            mesh_users[obj.data] = mesh_users.get(obj.data, 0) + 1
+
+    meshes = [mesh for mesh, users in mesh_users.items() if users >= mesh.users]
+
+    bpy.data.batch_remove(collections + list(objects) + meshes)
+
+    collection_index_clear()
+
+    freed['collections'] = len(collections)
+    freed['objects'] = len(objects)
+    freed['meshes'] = len(meshes)
+    freed['kept'] = len(kept)
+
+    return freed
+
+
+def collection_snapshot(path_string="/CVB"):
+    """Return a snapshot of the collection tree at the path, for collection_snapshot_diff()"""
+    #
+    # One tuple per collection, parents before their children:
+    #
+    #   (path, pointer, child count, object count)
+    #
+    # where path is the tuple of names below the snapshot's collection,
+    # () for the collection itself.
+    #
+
+    coll = _indexed('path', path_string, _walk_path)
+
+    if coll is None or isinstance(coll, bpy.types.Object):
+        return ()
+
+    snapshot = []
+    pending = [((), coll)]
+
+    while pending:
+        path, branch = pending.pop()
+        children = list(branch.children)
+
+        snapshot.append((path, branch.as_pointer(), len(children), len(branch.objects)))
+
+        pending.extend((path + (child.name,), child) for child in reversed(children))
+
+    return tuple(snapshot)
+
+
+def collection_snapshot_diff(before, after):
+    """Return the sketches, the children of the snapshots' collection, added,
+    removed, renamed (old, new) and changed below between two snapshots"""
+    #
+    # A sketch is followed by its pointer, so a rename is told apart from
+    # a remove and an add. Should Blender reuse the memory of a removed
+    # collection for a new one, that will be seen as a rename.
+    #
+
+    def sketches(snapshot):
+        names, subtrees = {}, {}
+
+        for path, pointer, child_count, object_count in snapshot:
+            if len(path) == 1:
+                names[pointer] = path[0]
+
+            if path:
+                subtrees.setdefault(path[0], []).append((path[1:], pointer, child_count, object_count))
+
+        return names, subtrees
+
+    names_before, subtrees_before = sketches(before)
+    names_after, subtrees_after = sketches(after)
+
+    renamed = [
+        (names_before[pointer], name) for pointer, name in names_after.items()
+        if pointer in names_before and names_before[pointer] != name]
+
+    renamed_to = {name for _, name in renamed}
+
+    return {
+        'added': [name for pointer, name in names_after.items() if pointer not in names_before],
+        'removed': [name for pointer, name in names_before.items() if pointer not in names_after],
+        'renamed': renamed,
+        'changed': [
+            name for name, subtree in subtrees_after.items()
+            if name not in renamed_to and name in subtrees_before and subtrees_before[name] != subtree],
+    }
 
 
 def collection_sibling_names(path_string):
@@ -166,27 +456,29 @@ def collection_sibling_names(path_string):
 
     parts = extract_path(path_string)
 
-    try:
-        last_i = len(parts) - 1
-
-        coll = bpy.data.collections[parts[0]]
+    if not parts:
+        return []
 
-        for i in range(1, last_i):
-            coll = coll.children[parts[i]]
+    last_i = len(parts) - 1
 
-        if coll:
-            for sibling_coll in coll.children:
-                if sibling_coll.name != parts[last_i]:
-                    siblings.append(sibling_coll.name)
+    # The parent, as a terminated path so every part is a collection
+    coll = _indexed('tail', "/" + "/".join(parts[:max(last_i, 1)]) + "/", _walk_tail)
 
-    except KeyError:
-        return []
+    if coll:
+        for sibling_coll in coll.children:
+            if sibling_coll.name != parts[last_i]:
+                siblings.append(sibling_coll.name)
 
     return siblings
 
 
 def collection_tail(path_string):
     """Walk the path, return the tail collection"""
+    return _indexed('tail', path_string, _walk_tail)
+
+
+def _walk_tail(path_string):
+    """Walk the path from the root, return the tail collection"""
 
     # pylint: disable=consider-using-enumerate
 
@@ -283,38 +575,23 @@ def new_root_node(path_string):
 
 def path_found(path_string):
     """Walk the path, return true if it exists"""
+    return not extract_path(path_string) or _indexed('path', path_string, _walk_path) is not None
 
-    # pylint: disable=consider-using-enumerate
-
-    parts = extract_path(path_string)
-
-    if parts:
 
-        try:
-            last_i = len(parts) - 1
-
-            coll = bpy.data.collections[parts[0]]
-
-            for i in range(1, len(parts)):
-                if i != last_i or \
-                        is_path_terminated(path_string) or \
-                        coll.children.get(parts[i]):
-                    coll = coll.children[parts[i]]  # Collection
-                else:
-                    coll = coll.objects[parts[i]]   # Blender Object
+def path_object(path_string):
+    """Walk the path, return object if it exists"""
 
-        except KeyError:
-            return False
+    found = _indexed('path', path_string, _walk_path)
 
-    return True
+    return found if isinstance(found, bpy.types.Object) else None
 
 
-def path_object(path_string):
-    """Walk the path, return object if it exists"""
+def _walk_path(path_string):
+    """Walk the path from the root, return the collection or object at its end"""
 
     # pylint: disable=consider-using-enumerate
 
-    blender_object = None
+    found = None
 
     parts = extract_path(path_string)
 
@@ -323,20 +600,32 @@ def path_object(path_string):
         try:
             last_i = len(parts) - 1
 
-            coll = bpy.data.collections[parts[0]]
+            found = bpy.data.collections[parts[0]]
 
             for i in range(1, len(parts)):
                 if i != last_i or \
                         is_path_terminated(path_string) or \
-                        coll.children.get(parts[i]):
-                    coll = coll.children[parts[i]]  # Collection
+                        found.children.get(parts[i]):
+                    found = found.children[parts[i]]  # Collection
                 else:
-                    blender_object = coll.objects[parts[i]]   # Blender Object
+                    found = found.objects[parts[i]]   # Blender Object
 
         except KeyError:
             return None
 
-    return blender_object
+    return found
+
+
+def sketch_collection_spec(sketch_names):
+    """Return the collection_add_tree() spec of the sketches' collections"""
+
+    return {"CVB": {
+        sketch_name: {
+            "Sketch ~ " + sketch_name: None,
+            "Map ~ " + sketch_name: None,
+            "Terrain ~ " + sketch_name: None,
+            "City ~ " + sketch_name: {"Tour ~ " + sketch_name: None},
+        } for sketch_name in sketch_names}}
 
 
 def viewlayer_collections(path_string):
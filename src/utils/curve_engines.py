@@ -0,0 +1,318 @@
+"""Space-filling curves for numbering the tiles of a region"""
+#
+# The header of fass_grid.py explains why the tiles of a region are
+# numbered along a FASS curve guided by a spiral: consecutive tiles
+# should sit next to each other so that work on one tile can lean on
+# the tiles just done. That is a claim that can be measured, so the
+# numbering is put behind a small interface and a few well known
+# curves are offered for comparison (see benchmarks/bench_curve_engines.py).
+#
+# A curve engine numbers the tiles of a square region (order*9) tiles
+# across. All it has to provide are two tables:
+#
+#   _tile_to_xy         (N, 2) array; the x, y of every tile id
+#   _xy_to_tile         2D array indexed by [x - offset_x, y - offset_y];
+#                       the tile id at x, y or -1 where there is none
+#
+# Everything else, lookups, batch lookups and neighborhood queries,
+# is answered from those tables in the same way for every curve.
+# fassGrid walks its curve to build them; the curves offered for
+# comparison only sort the cells of the region, see CellOrderCurve.
+#
+# Only fassGrid keeps tile 0 at the center of the region (requirement 4
+# of fass_grid.py). Hilbert and Z-order curves are laid over the region
+# from the top left corner and are only meant for comparison.
+#
+# Copyright (c) 2021 Keith Pinson
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+def _offset_lookup(table, index, i, j):
+    """Return: table[index, i, j] with -1 wherever i, j fall outside the table"""
+
+    inside = (i >= 0) & (i < table.shape[1]) & (j >= 0) & (j < table.shape[2])
+
+    return np.where(inside, table[index, np.where(inside, i, 0), np.where(inside, j, 0)], -1)
+
+
+class CurveEngine(ABC):
+    """The tile numbering of a region, answered from a pair of lookup tables"""
+
+    _sector_width = 9  # A region is (order*9) tiles across
+    _order = None
+
+    _tile_to_xy, _xy_to_tile, _xy_to_tile_offset = None, None, None
+    _corners = None
+
+    # Steps to the neighbors; N, E, S, W, then the diagonals NE, SE, SW, NW
+    _neighbor_steps = np.array(
+        [(0, -1), (1, 0), (0, 1), (-1, 0), (1, -1), (1, 1), (-1, 1), (-1, -1)], dtype=np.int64)
+
+    def __init__(self, order):
+        self._order = order
+
+        self._build_tables(order)
+        self._tables_ready()
+
+    def _tables_ready(self):
+        """Seal the tables once built or loaded"""
+
+        # Shared with other subsystems as is, so guard against accidental edits
+        for table in (self._tile_to_xy, self._xy_to_tile, self._xy_to_tile_offset):
+            table.flags.writeable = False
+
+        # Kept as plain ints, scalar lookups clamp to them on every call
+        left, top = (int(n) for n in self._xy_to_tile_offset)
+        width, height = self._xy_to_tile.shape
+        self._corners = (left, top, left + width - 1, top + height - 1)
+
+    @abstractmethod
+    def _build_tables(self, order):
+        """Set _tile_to_xy, _xy_to_tile and _xy_to_tile_offset for the region order"""
+
+    def _clamp_xy(self, x, y):
+        """Return: indices into _xy_to_tile of x, y clamped to the region"""
+
+        width, height = self._xy_to_tile.shape
+
+        i = np.clip(np.asarray(x, dtype=np.int64) - self._xy_to_tile_offset[0], 0, width - 1)
+        j = np.clip(np.asarray(y, dtype=np.int64) - self._xy_to_tile_offset[1], 0, height - 1)
+
+        return i, j
+
+    def get_tile_xy(self, tile_id):
+
+        # Ids outside the grid land on the first tile
+        if not 0 <= tile_id < len(self._tile_to_xy):
+            tile_id = 0
+
+        x, y = self._tile_to_xy[int(tile_id)].tolist()
+
+        return x, y
+
+    def get_tile_id(self, x, y):
+
+        left, top, right, bottom = self._corners
+
+        x = min(max(x, left), right)
+        y = min(max(y, top), bottom)
+
+        tile_id = int(self._xy_to_tile[x - left, y - top])
+
+        if tile_id < 0:
+            raise KeyError((x, y))
+
+        return tile_id
+
+    def get_tile_xy_many(self, tile_ids):
+        """Batch get_tile_xy(); Return: xs, ys arrays shaped like tile_ids"""
+
+        ids = np.asarray(tile_ids, dtype=np.int64)
+
+        # As with get_tile_xy(), ids outside the grid land on the first tile
+        ids = np.where((ids >= 0) & (ids < len(self._tile_to_xy)), ids, 0)
+
+        xy = self._tile_to_xy[ids]
+
+        return xy[..., 0], xy[..., 1]
+
+    def get_tile_id_many(self, xs, ys):
+        """Batch get_tile_id(); Return: tile id array, -1 where get_tile_id() finds no tile"""
+
+        i, j = self._clamp_xy(xs, ys)
+
+        return self._xy_to_tile[i, j]
+
+    def get_tile_id_for_points(self, points, tile_size=1000.0):
+        """Return: tile ids of (N, 2) world points in meters, -1 where off the grid,
+        and their (N, 2) offsets in meters from the center of their tile"""
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        size = np.broadcast_to(np.asarray(tile_size, dtype=np.float64), (2,))
+
+        # Inverse of get_tile_matrices(); tiles are centered on their position
+        # and y is flipped back to count down the screen
+        xy = np.floor(points * (1.0, -1.0) / size + 0.5).astype(np.int64)
+        offsets = points - xy * (1.0, -1.0) * size
+
+        return self._find_tile_ids(xy[:, 0], xy[:, 1]), offsets
+
+    def get_tile_to_xy_table(self):
+        """Return: read-only (N, 2) array of the x, y of every tile id"""
+        return self._tile_to_xy
+
+    def get_xy_to_tile_table(self):
+        """Return: read-only 2D array of tile ids (-1 if none) and its [x, y] index offset"""
+        return self._xy_to_tile, self._xy_to_tile_offset
+
+    #
+    # Neighborhood queries. Unlike get_tile_id(), positions off the grid are not
+    # clamped, they are dropped. Results are sorted by tile id, i.e. in curve order.
+    #
+
+    def _find_tile_ids(self, x, y):
+        """Return: tile ids at x, y without clamping, -1 where off the grid"""
+        return _offset_lookup(
+            self._xy_to_tile[None], 0, x - self._xy_to_tile_offset[0], y - self._xy_to_tile_offset[1])
+
+    def get_tile_neighbors(self, tile_id, diagonal=False):
+        """Return: sorted array of the 4 (or with diagonal, 8) tiles touching the tile"""
+
+        x, y = self.get_tile_xy(tile_id)
+        steps = self._neighbor_steps if diagonal else self._neighbor_steps[:4]
+
+        tile_ids = self._find_tile_ids(x + steps[:, 0], y + steps[:, 1])
+
+        return np.sort(tile_ids[tile_ids >= 0])
+
+    def get_tile_neighbors_many(self, tile_ids, diagonal=False):
+        """Batch neighbors; Return: (N, 4) or (N, 8) array, columns in the order
+        of _neighbor_steps so each side can be told apart, -1 where off the grid"""
+
+        xs, ys = self.get_tile_xy_many(np.ravel(tile_ids))
+        steps = self._neighbor_steps if diagonal else self._neighbor_steps[:4]
+
+        return self._find_tile_ids(xs[:, None] + steps[:, 0], ys[:, None] + steps[:, 1])
+
+    def get_tile_ids_in_rect(self, left, top, right, bottom):
+        """Return: sorted array of the tiles from left, top to right, bottom inclusive"""
+
+        offset_x, offset_y = (int(n) for n in self._xy_to_tile_offset)
+        width, height = self._xy_to_tile.shape
+
+        i0, i1 = max(left - offset_x, 0), min(right - offset_x + 1, width)
+        j0, j1 = max(top - offset_y, 0), min(bottom - offset_y + 1, height)
+
+        if i0 >= i1 or j0 >= j1:
+            return np.empty(0, dtype=self._xy_to_tile.dtype)
+
+        tile_ids = self._xy_to_tile[i0:i1, j0:j1].ravel()
+
+        return np.sort(tile_ids[tile_ids >= 0])
+
+    def get_tile_ring(self, tile_id, k=1):
+        """Return: sorted array of the tiles within k steps (diagonals included) of the tile,
+        the tile itself included"""
+
+        x, y = self.get_tile_xy(tile_id)
+
+        return self.get_tile_ids_in_rect(x - k, y - k, x + k, y + k)
+
+    def get_tile_matrices(self, tile_ids, tile_size=1000.0, scale=1.0):
+        """Return: (N, 4, 4) world matrices placing each tile, tile_size meters
+        across (or x, y meters), at its position; scale is uniform, one or per tile"""
+
+        xs, ys = self.get_tile_xy_many(np.ravel(tile_ids))
+        size_x, size_y = np.broadcast_to(np.asarray(tile_size, dtype=np.float64), (2,))
+
+        matrices = np.zeros((len(xs), 4, 4))
+        matrices[:, (0, 1, 2), (0, 1, 2)] = np.broadcast_to(
+            np.asarray(scale, dtype=np.float64).reshape(-1, 1), (len(xs), 3))
+        matrices[:, 3, 3] = 1.0
+
+        # Tiles count down the screen (+y) where Blender counts up, so y is flipped
+        matrices[:, 0, 3] = xs * size_x
+        matrices[:, 1, 3] = -ys * size_y
+
+        return matrices
+
+    def get_tile_id_offset_top_left(self, x, y):
+        left, top, _, _ = self.get_grid_corners()
+        return self.get_tile_id(x + left, y + top)
+
+    def get_order(self):
+        return self._order
+
+    def get_grid_size(self):
+        return (self._order*self._sector_width) ** 2
+
+    def get_last_tile(self):
+        return (self._order * self._sector_width) ** 2 - 1
+
+    def get_grid_corners(self):
+        return self._corners
+
+
+class CellOrderCurve(CurveEngine):
+    """A curve that visits the cells of the region in the order of a sort key"""
+
+    def _build_tables(self, order):
+        """Set the tables by visiting every cell of the region in order of _curve_keys()"""
+
+        side = order * self._sector_width
+        first = -int(side / 2)
+
+        i, j = np.meshgrid(np.arange(side), np.arange(side), indexing='ij')
+        i, j = i.ravel(), j.ravel()
+
+        visit = np.argsort(self._curve_keys(i, j, side), kind='stable')
+
+        self._tile_to_xy = np.stack((i[visit] + first, j[visit] + first), axis=-1).astype(np.int32)
+        self._xy_to_tile = np.full((side, side), -1, dtype=np.int32)
+        self._xy_to_tile[i[visit], j[visit]] = np.arange(side**2)
+        self._xy_to_tile_offset = np.array((first, first), dtype=np.int64)
+
+    @abstractmethod
+    def _curve_keys(self, i, j, side):
+        """Return: for cells i, j of a side x side square counted from the top
+        left, keys that sort in the order the curve visits the cells"""
+
+
+class HilbertCurve(CellOrderCurve):
+    """Hilbert curve over the smallest power of two square covering the region"""
+
+    def _curve_keys(self, i, j, side):
+        n = 1 << max(side - 1, 1).bit_length()
+
+        x, y = i.copy(), j.copy()
+        d = np.zeros_like(x)
+        s = n // 2
+
+        while s > 0:
+            rx = (x & s) > 0
+            ry = (y & s) > 0
+            d += s * s * ((3 * rx) ^ ry)
+
+            # Rotate the quadrant so the sub-curve is walked the right way round
+            flip = ~ry & rx
+            x = np.where(flip, n - 1 - x, x)
+            y = np.where(flip, n - 1 - y, y)
+            x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+
+            s //= 2
+
+        return d
+
+
+class ZOrderCurve(CellOrderCurve):
+    """Z-order (Morton) curve; interleaves the bits of x and y"""
+
+    def _curve_keys(self, i, j, side):
+        d = np.zeros_like(i)
+
+        for bit in range(max(side - 1, 1).bit_length()):
+            d |= ((i >> bit) & 1) << (2 * bit)
+            d |= ((j >> bit) & 1) << (2 * bit + 1)
+
+        return d
+
+
+class SquareSpiralCurve(CellOrderCurve):
+    """Plain square spiral winding out from the center tile, one ring at a time"""
+
+    def _curve_keys(self, i, j, side):
+        first = -int(side / 2)
+        x, y = i + first, j + first
+
+        r = np.maximum(np.abs(x), np.abs(y))
+        ring_start = (2 * r - 1) ** 2
+
+        # Each ring of 8r tiles starts just past its corner at r, -r; the
+        # center, with r = 0, falls to the last choice and a key of 0
+        return np.select(
+            [(x == r) & (y > -r), (y == r) & (x < r), (x == -r) & (y < r)],
+            [ring_start + (y + r - 1), ring_start + 2*r + (r - 1 - x), ring_start + 4*r + (r - 1 - y)],
+            np.where(r > 0, ring_start + 6*r + (x + r - 1), 0))
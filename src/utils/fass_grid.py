@@ -33,8 +33,14 @@
 #
 # Copyright (c) 2021 Keith Pinson
 
+import glob
+import hashlib
+import os
+from functools import lru_cache
 import bpy
+import numpy as np
 from ..addon.preferences import cvb_prefs
+from .curve_engines import CurveEngine
 
 #
 # Terms Used:
@@ -58,13 +64,35 @@ from ..addon.preferences import cvb_prefs
 #
 
 
-class fassGrid:
+def _xy_to_id_table(id_to_xy, offset):
+    """Return: 2D array indexed by [x - offset_x, y - offset_y] holding ids, -1 if none"""
+
+    indices = id_to_xy - np.asarray(offset)
+
+    table = np.full(tuple(indices.max(axis=0) + 1), -1, dtype=np.int64)
+    table[indices[:, 0], indices[:, 1]] = np.arange(len(id_to_xy))
+
+    return table
+
+
+class fassGrid(CurveEngine):
 
     _default_order = 11
     _sector_width = 9  # Sectors are square
-    _xy_to_sector, _sector_to_xy, _sector_to_qrx = None, None, None
-    _atX_xy_to_tile, _atQ_xy_to_tile, _atR_xy_to_tile = None, None, None
-    _atX_tile_to_xy, _atQ_tile_to_xy, _atR_tile_to_xy = None, None, None
+
+    # Every table is a dense array: "_a_to_b" arrays are indexed by id and hold xy pairs,
+    # "_xy_to_a" arrays are indexed by [x - offset_x, y - offset_y] and hold ids or -1
+    # (the tile tables themselves, _tile_to_xy and _xy_to_tile, are kept by CurveEngine)
+    _sector_to_xy, _sector_to_qrx, _fass_tile_to_xy = None, None, None
+
+    # Tables persisted by _save_tables(); bump _cache_format if how they are built changes
+    _cached_tables = ("_sector_to_xy", "_sector_to_qrx", "_fass_tile_to_xy",
+                      "_tile_to_xy", "_xy_to_tile", "_xy_to_tile_offset")
+    _cache_format = 1
+
+    # Sector letters are stored as their index in _qrx_letters
+    _qrx_letters = "XQRqr"
+    _qrx_curve, _qrx_sign, _qrx_corner = None, None, None
 
     # L-System for the spiralling guiding curve (L-System is best used for drawing a curve)
     # @Q, @R, @X are the FASS curves at each step of the guided curve (they will be hard-coded)
@@ -78,6 +106,18 @@ class fassGrid:
         }
     )
 
+    _atX = "+>->->>->>->>>-+>>->>->->+>+>>+>>->>->->+>+>->>-" \
+           ">->+>+>>+>>->-+>>->>->->+>+>>+>>->>->->+>+>>+>>-" \
+           ">>->->+>+>->>->->+>+>>+>>->>->->+>+>>+>>-"
+
+    _atQ = "->+>+>->->>->>+>>+>+>->->>->>+>>>+>>+>+>->->>->>+" \
+           ">>+>+>->->>->>+>>+>+>->->+>>>+>>+>+>->->>->+>+>->" \
+           "->>->>+>>+>+>->->>->>+->->>+>>+>+>->->"
+
+    _atR = ">+>+>->->>->>+>+->>+>>+>+>->->>->>+>>+>+>->->+>>+>" \
+           "+>->->>->>+->->+>+>->->>->>+>>+>+>->->>->>+>>+>+>-" \
+           ">->>->>+->->>+>>+>+>->->>->>+>>+>+>->->+"
+
     def _move(self, direction, position):
         pos = position
 
@@ -106,67 +146,48 @@ class fassGrid:
 
         return c
 
-    # The L-System his highly recursive, instead we will loop and make dictionaries to translate positions
+    # The L-System his highly recursive, instead we will loop and make arrays to translate positions
     def _cvb_qr_loop_converters(self, soft_order):
-        """Return: xy_to_sector, sector_to_xy, sector_to_qrx"""
+        """Return: sector_to_xy, sector_to_qrx"""
 
-        n = 0
-        d = ""
         c = 'N'
         pos = (0, 0)
-        w = {(0, 0): 0}  # xy_to_sector
-        u = {0: (0, 0)}  # sector_to_xy
-        v = {0: "X"}     # sector_to_qrx
+        u = [(0, 0)]                        # sector_to_xy
+        v = [self._qrx_letters.index("X")]  # sector_to_qrx
 
         for i in range(0, soft_order):
             if i == 0:
-                n = 0
-                d = "X"
-                c = 'N'
-                w = {(0, 0): 0}
-                u = {0: (0, 0)}
-                v = {0: "X"}
                 pos = self._move(c, pos)
-                n += 1
                 c = self._turn('-', c)
             else:
                 for j in range(i + 1):
                     d = "r" if (i % 2) == 0 else "R"
-                    w[pos] = n
-                    u[n] = pos
-                    v[n] = d
-
-                    if j < i:
-                        pos = self._move(c, pos)
-                        n += 1
-                    else:
+                    u.append(pos)
+                    v.append(self._qrx_letters.index(d))
+
+                    if j == i:
                         c = self._turn('-', c)
-                        pos = self._move(c, pos)
-                        n += 1
+
+                    pos = self._move(c, pos)
 
                 for _ in range(i):
                     d = "Q" if (i % 2) == 0 else "q"
-                    w[pos] = n
-                    u[n] = pos
-                    v[n] = d
+                    u.append(pos)
+                    v.append(self._qrx_letters.index(d))
 
                     pos = self._move(c, pos)
-                    n += 1
                 c = self._turn('-', c)
 
-        return w, u, v
+        return np.array(u, dtype=np.int64), np.array(v, dtype=np.int64)
 
     # Convert a passed FASS string like, "+>->->>->>->>>-+>>->>-" to
-    # conversion dictionaries, like {0:(0,0), 1:(0,-1), 2:(1,-1), 3:(1,0), 4:(1,1), ...}
+    # a conversion array, like [(0,0), (0,-1), (1,-1), (1,0), (1,1), ...]
     def _cvb_fass_converters(self, fass_string, heading):
-        """Return: xy_to_tile, tile_to_xy, tile_to_qrx"""
+        """Return: tile_to_xy"""
 
-        n = 0
-        d = ""
         c = heading
         pos = (0, 0)
-        w = {(0, 0): 0}  # xy_to_tile
-        u = {0: (0, 0)}  # tile_to_xy
+        u = [(0, 0)]  # tile_to_xy
 
         for k in fass_string:
 
@@ -174,17 +195,12 @@ class fassGrid:
                 c = self._turn(k, c)
             elif k == '>':
                 pos = self._move(c, pos)
-                n += 1
-            else:
-                continue
+                u.append(pos)
 
-            w[pos] = n
-            u[n] = pos
-
-        return w, u
+        return np.array(u, dtype=np.int64)
 
     def _fass_order(self):
-        return cvb_prefs(bpy.context).cvb_terrain_region_order if cvb_prefs(bpy.context) else self._default_order
+        return fass_preferred_order()
 
     def _get_xy_in_sector(self, atLetter, starting_xy, relative_tile_id):
 
@@ -199,163 +215,160 @@ class fassGrid:
 
         return x, y
 
-    def __init__(self):
-        (self._xy_to_sector, self._sector_to_xy, self._sector_to_qrx) = self._cvb_qr_loop_converters(self._fass_order())
+    def __init__(self, order=None):
+        # pylint: disable=super-init-not-called
+        # The order is fixed for the life of the grid, see fass_grid_for_order()
+        self._order = order if order else self._fass_order()
+        order = self._order
 
-        _atX = "+>->->>->>->>>-+>>->>->->+>+>>+>>->>->->+>+>->>-" \
-               ">->+>+>>+>>->-+>>->>->->+>+>>+>>->>->->+>+>>+>>-" \
-               ">>->->+>+>->>->->+>+>>+>>->>->->+>+>>+>>-"
+        self._set_qrx_rules()
 
-        _atQ = "->+>+>->->>->>+>>+>+>->->>->>+>>>+>>+>+>->->>->>+" \
-               ">>+>+>->->>->>+>>+>+>->->+>>>+>>+>+>->->>->+>+>->" \
-               "->>->>+>>+>+>->->>->>+->->>+>>+>+>->->"
+        if not self._load_tables(order):
+            self._build_tables(order)
+            self._save_tables(order)
 
-        _atR = ">+>+>->->>->>+>+->>+>>+>+>->->>->>+>>+>+>->->+>>+>" \
-               "+>->->>->>+->->+>+>->->>->>+>>+>+>->->>->>+>>+>+>-" \
-               ">->>->>+->->>+>>+>+>->->>->>+>>+>+>->->+"
+        self._tables_ready()
 
-        (self._atX_xy_to_tile, self._atX_tile_to_xy) = self._cvb_fass_converters(_atX, 'E')
-        (self._atQ_xy_to_tile, self._atQ_tile_to_xy) = self._cvb_fass_converters(_atQ, 'N')
-        (self._atR_xy_to_tile, self._atR_tile_to_xy) = self._cvb_fass_converters(_atR, 'E')
+    def _tables_ready(self):
+        super()._tables_ready()
 
-    def _get_sector_number(self, x, y):
+        # The tile tables are sealed by CurveEngine, seal the sector and curve tables too
+        for table in (self._sector_to_xy, self._sector_to_qrx, self._fass_tile_to_xy):
+            table.flags.writeable = False
 
-        offset_x = x + int((self._fass_order()*self._sector_width) / 2)
-        offset_y = y + int((self._fass_order()*self._sector_width) / 2)
+    def _set_qrx_rules(self):
+        # For each letter of _qrx_letters: the curve walked, whether it is walked
+        # mirrored, and where its start sits relative to the sector center
+        w = self._sector_width
+        h = int(w / 2)
+        self._qrx_curve = np.array([0, 1, 2, 1, 2], dtype=np.int64)
+        self._qrx_sign = np.array([1, 1, 1, -1, -1], dtype=np.int64)
+        self._qrx_corner = np.array([(0, 0), (-h, h), (-h, h), (h, -h), (h, -h)], dtype=np.int64)
 
-        offset_sector_x = int(offset_x / self._sector_width)
-        offset_sector_y = int(offset_y / self._sector_width)
+    def _build_tables(self, order):
+        w = self._sector_width
 
-        sector_x = offset_sector_x - int(self._fass_order() / 2)
-        sector_y = offset_sector_y - int(self._fass_order() / 2)
+        (self._sector_to_xy, self._sector_to_qrx) = self._cvb_qr_loop_converters(order)
 
-        return self._xy_to_sector[(sector_x, sector_y)]
+        # The curves are stacked in the order X, Q, R and fall within -(w-1)..(w-1)
+        self._fass_tile_to_xy = np.stack((
+            self._cvb_fass_converters(self._atX, 'E'),
+            self._cvb_fass_converters(self._atQ, 'N'),
+            self._cvb_fass_converters(self._atR, 'E')))
 
-    def _get_sector_xy(self, tile_id):
-        length = len(self._sector_to_xy)
-        sector_id = int(tile_id / self._sector_width**2)
-        return self._sector_to_xy[sector_id] \
-            if sector_id < length else self._sector_to_xy[length-1]
+        # With the sectors and curves in hand, resolve every tile of the grid once
+        # so that any later conversion is a single indexed load. The xy table is
+        # the exact inverse, so it spans wherever the spiral went; for an even
+        # order the spiral can't be centered and the region leans toward +x, -y
+        tile_xy = self._walk_tile_xy(np.arange(len(self._sector_to_xy) * w**2))
+        self._tile_to_xy = np.stack(tile_xy, axis=-1).astype(np.int32)
+        self._xy_to_tile_offset = self._tile_to_xy.min(axis=0).astype(np.int64)
+        self._xy_to_tile = _xy_to_id_table(self._tile_to_xy, self._xy_to_tile_offset).astype(np.int32)
 
-    def _get_sector_qrx(self, tile_id):
-        length = len(self._sector_to_xy)
-        sector_id = int(tile_id / self._sector_width**2)
-        return self._sector_to_qrx[sector_id] \
-            if sector_id < length else self._sector_to_xy[length-1]
+    #
+    # The tables are cached as .npy files in the add-on's assets folder, one file
+    # per table, named by order and by a hash of everything the tables are derived
+    # from. Editing a curve changes the hash, so stale files are simply not found.
+    # Files are memory-mapped read-only, so loading costs little more than opening.
+    #
 
-    def get_tile_xy(self, tile_id):
-        sector_x, sector_y = self._get_sector_xy(tile_id)
-        x, y = 0, 0
-        x_offset, y_offset = 0, 0
-        qrx = self._get_sector_qrx(tile_id)
+    def _cache_folder(self):
+        prefs = cvb_prefs(bpy.context)
+        folder = bpy.path.abspath(prefs.cvb_asset_folder_prop) if prefs else ""
+        return os.path.join(folder, "fass_grid") if folder else ""
 
-        pos = int(tile_id % self._sector_width**2)
+    def _cache_version(self):
+        definition = repr((self._cache_format, self._sector_width, self._cvb_fass, self._atX, self._atQ, self._atR))
+        return hashlib.sha1(definition.encode('utf-8')).hexdigest()[:12]
 
-        if qrx == 'X':
-            pos = pos if pos < len(self._atX_tile_to_xy) else 0
-            x, y = self._atX_tile_to_xy[pos]
-            x_offset = 0
-            y_offset = 0
+    def _cache_file(self, folder, order, name):
+        return os.path.join(folder, "fass-{0:02d}-{1}{2}.npy".format(order, self._cache_version(), name))
 
-        elif qrx == 'Q':
-            pos = pos if pos < len(self._atQ_tile_to_xy) else 0
-            x_offset = (self._sector_width * sector_x) - int(self._sector_width / 2)
-            y_offset = (self._sector_width * sector_y) + int(self._sector_width / 2)
-            x, y = self._atQ_tile_to_xy[pos]
+    def _load_tables(self, order):
+        """Return: True if every table was found in the cache"""
 
+        folder = self._cache_folder()
 
-        elif qrx == 'R':
-            pos = pos if pos < len(self._atR_tile_to_xy) else 0
-            x_offset = (self._sector_width * sector_x) - int(self._sector_width / 2)
-            y_offset = (self._sector_width * sector_y) + int(self._sector_width / 2)
-            x, y = self._atR_tile_to_xy[pos]
+        if not folder:
+            return False
 
-        elif qrx == 'q':
-            pos = pos if pos < len(self._atQ_tile_to_xy) else 0
-            x_offset = (self._sector_width * sector_x) + int(self._sector_width / 2)
-            y_offset = (self._sector_width * sector_y) - int(self._sector_width / 2)
-            x, y = self._atQ_tile_to_xy[pos]
-            x = -x
-            y = -y
+        try:
+            tables = {name: np.load(self._cache_file(folder, order, name), mmap_mode='r')
+                      for name in self._cached_tables}
+        except (OSError, ValueError):
+            return False
 
-        elif qrx == 'r':
-            pos = pos if pos < len(self._atR_tile_to_xy) else 0
-            x_offset = (self._sector_width * sector_x) + int(self._sector_width / 2)
-            y_offset = (self._sector_width * sector_y) - int(self._sector_width / 2)
-            x, y = self._atR_tile_to_xy[pos]
-            x = -x
-            y = -y
+        # Plain array views of the maps index faster than the memmap objects
+        for name, table in tables.items():
+            setattr(self, name, np.asarray(table))
 
-        x = x + x_offset
-        y = y + y_offset
+        return True
+
+    def _save_tables(self, order):
+        """Write the tables to the cache, dropping files of other curve versions"""
+
+        folder = self._cache_folder()
+
+        if not folder:
+            return
+
+        try:
+            os.makedirs(folder, exist_ok=True)
+
+            for stale in glob.glob(os.path.join(glob.escape(folder), "fass-{0:02d}-*.npy".format(order))):
+                os.remove(stale)
+
+            for name in self._cached_tables:
+                file_name = self._cache_file(folder, order, name)
+
+                # Write aside and swap in so a reader never maps a partial file
+                with open(file_name + ".tmp", 'wb') as file:
+                    np.save(file, getattr(self, name))
+
+                os.replace(file_name + ".tmp", file_name)
+
+        except OSError as err:
+            # Not fatal, the tables are simply rebuilt next time
+            print("FASS grid tables not cached:", err)
+
+    def _walk_tile_xy(self, tile_ids):
+        """Return: xs, ys of in-range tile_ids, following sector and curve"""
+
+        w = self._sector_width
+
+        sector = tile_ids // w**2
+        qrx = self._sector_to_qrx[sector]
+
+        xy = self._fass_tile_to_xy[self._qrx_curve[qrx], tile_ids % w**2]
+        xy = self._qrx_sign[qrx][..., None] * xy + w * self._sector_to_xy[sector] + self._qrx_corner[qrx]
+
+        return xy[..., 0], xy[..., 1]
+
+    def iter_tiles(self, start=0, stop=None, chunk=4096):
+        """Walk the tiles in curve order, chunk tiles at a time;
+        Yield: tile_ids, xs, ys, sectors, qrx letters as arrays"""
+
+        w = self._sector_width
+        letters = np.array(tuple(self._qrx_letters))
+
+        start = max(start, 0)
+        stop = len(self._tile_to_xy) if stop is None else min(stop, len(self._tile_to_xy))
+
+        for first in range(start, stop, chunk):
+            tile_ids = np.arange(first, min(first + chunk, stop))
+            sectors = tile_ids // w**2
+            xy = self._tile_to_xy[first:first + len(tile_ids)]
+
+            yield tile_ids, xy[:, 0], xy[:, 1], sectors, letters[self._sector_to_qrx[sectors]]
+
+
+@lru_cache(maxsize=4)
+def fass_grid_for_order(order):
+    """Return the one shared grid of the given region order, built on first use"""
+    return fassGrid(order)
 
-        return x, y
 
-    def get_tile_id(self, x, y):
-
-        tile_id = 0
-
-        abs_max = int(self._fass_order() * self._sector_width / 2)
-
-        if x < -abs_max:
-            x = -abs_max
-        elif x > abs_max:
-            x = abs_max
-
-        if y < -abs_max:
-            y = -abs_max
-        elif y > abs_max:
-            y = abs_max
-
-        sector_number = self._get_sector_number(x, y)
-        qrx = self._sector_to_qrx[sector_number]
-        sector_x, sector_y = self._sector_to_xy[sector_number]
-
-        tile_id_offset = sector_number * (self._sector_width ** 2)
-
-        corner_x = (x + abs_max) % self._sector_width
-        corner_y = (y + abs_max) % self._sector_width
-
-        if qrx == 'X':
-            pos_x = x
-            pos_y = y
-            tile_id = self._atX_xy_to_tile[(pos_x, pos_y)]
-        elif qrx == 'Q':
-            pos_x = corner_x - 0
-            pos_y = corner_y - (self._sector_width - 1)
-            tile_id = self._atQ_xy_to_tile[(pos_x, pos_y)]
-        elif qrx == 'R':
-            pos_x = corner_x - 0
-            pos_y = corner_y - (self._sector_width - 1)
-            tile_id = self._atR_xy_to_tile[(pos_x, pos_y)]
-        elif qrx == 'q':
-            pos_x = corner_x - (self._sector_width - 1)
-            pos_y = corner_y - 0
-            pos_x = -pos_x
-            pos_y = -pos_y
-            tile_id = self._atQ_xy_to_tile[(pos_x, pos_y)]
-        elif qrx == 'r':
-            pos_x = corner_x - (self._sector_width - 1)
-            pos_y = corner_y - 0
-            pos_x = -pos_x
-            pos_y = -pos_y
-            tile_id = self._atR_xy_to_tile[(pos_x, pos_y)]
-
-        tile_id = tile_id + tile_id_offset
-
-        return tile_id
-
-    def get_tile_id_offset_top_left(self, x, y):
-        offset_x = x - int((self._fass_order()*self._sector_width) / 2)
-        offset_y = y - int((self._fass_order()*self._sector_width) / 2)
-        return self.get_tile_id(offset_x, offset_y)
-
-    def get_grid_size(self):
-        return (self._fass_order()*self._sector_width) ** 2
-
-    def get_last_tile(self):
-        return (self._fass_order() * 9) ** 2 - 1
-
-    def get_grid_corners(self):
-        max_tile = int(self._fass_order() * 9 / 2)
-        return (-max_tile, -max_tile, max_tile, max_tile)
\ No newline at end of file
+def fass_preferred_order():
+    """Return the region order set in the add-on preferences"""
+    prefs = cvb_prefs(bpy.context)
+    return prefs.cvb_terrain_region_order if prefs else fassGrid._default_order
@@ -0,0 +1,167 @@
+"""Materials shared by the objects of a city, by style and role"""
+#
+# A dense tile has thousands of buildings and props, but only a
+# handful of materials: a roof of a medieval city is much the same
+# as any other. So materials are kept in a pool by style and role,
+# written "style/role" as in "grid/terrain" or "medieval/roof", and
+# made only the first time one is asked for.
+#
+# The pool keeps the material datablocks it hands out, by name. Like
+# the path index of collection_utils, one is handed out again as long
+# as it has not been removed or renamed, and the pool is cleared after
+# a file is loaded, an undo or a redo, as those replace every datablock.
+#
+# Usage:
+#
+#     pool = material_pool()
+#     pool.assign(meshes, ["medieval/wall", "medieval/roof"], [is_roof.astype(int) for is_roof in roof_faces])
+#
+# Copyright (c) 2021 Keith Pinson
+
+from math import isclose
+
+import bpy
+import numpy as np
+
+# The viewport color, metallic and roughness of each role, by style
+_CVB_PALETTES = {
+    'grid': {
+        'terrain': ((0.12, 0.30, 0.08, 1.0), 0.0, 0.4),
+        'road': ((0.05, 0.05, 0.05, 1.0), 0.0, 0.8),
+        'wall': ((0.60, 0.58, 0.55, 1.0), 0.0, 0.6),
+        'roof': ((0.20, 0.20, 0.22, 1.0), 0.0, 0.7),
+        'water': ((0.05, 0.15, 0.30, 1.0), 0.0, 0.1),
+    },
+    'medieval': {
+        'terrain': ((0.15, 0.28, 0.08, 1.0), 0.0, 0.5),
+        'road': ((0.30, 0.25, 0.18, 1.0), 0.0, 0.9),
+        'wall': ((0.72, 0.66, 0.55, 1.0), 0.0, 0.8),
+        'roof': ((0.45, 0.16, 0.10, 1.0), 0.0, 0.7),
+        'water': ((0.08, 0.16, 0.22, 1.0), 0.0, 0.2),
+    },
+    'skyscrapers': {
+        'terrain': ((0.10, 0.22, 0.08, 1.0), 0.0, 0.4),
+        'road': ((0.04, 0.04, 0.05, 1.0), 0.0, 0.7),
+        'wall': ((0.35, 0.42, 0.50, 1.0), 0.6, 0.2),
+        'roof': ((0.25, 0.25, 0.25, 1.0), 0.2, 0.5),
+        'water': ((0.04, 0.12, 0.25, 1.0), 0.0, 0.1),
+    },
+    'western': {
+        'terrain': ((0.45, 0.36, 0.20, 1.0), 0.0, 0.8),
+        'road': ((0.50, 0.40, 0.28, 1.0), 0.0, 1.0),
+        'wall': ((0.55, 0.38, 0.22, 1.0), 0.0, 0.8),
+        'roof': ((0.35, 0.25, 0.15, 1.0), 0.0, 0.8),
+        'water': ((0.10, 0.20, 0.25, 1.0), 0.0, 0.2),
+    },
+}
+
+_CVB_MATERIAL_POOL = None
+
+
+def material_pool():
+    """Return the material pool shared by the add-on"""
+    global _CVB_MATERIAL_POOL
+
+    if _CVB_MATERIAL_POOL is None:
+        _CVB_MATERIAL_POOL = MaterialPool()
+
+    return _CVB_MATERIAL_POOL
+
+
+class MaterialPool:
+    """Materials by "style/role", made once and reused"""
+
+    def __init__(self, palettes=None):
+        self.palettes = palettes if palettes is not None else _CVB_PALETTES
+        self.materials = {}  # material by name
+
+    @staticmethod
+    def material_name(key):
+        return "CVB " + key
+
+    def clear(self):
+        """Forget every material handed out, they will be looked up again"""
+        self.materials.clear()
+
+    def get(self, key):
+        """Return the material of the "style/role", made if need be; KeyError if not in a palette"""
+
+        style, _, role = key.partition("/")
+        material_color, metallic, roughness = self.palettes[style][role]
+
+        return self.material(self.material_name(key), material_color, metallic, roughness)
+
+    def material(self, name, material_color, metallic, roughness):
+        """Return the material by name, made if need be, with viewport color, metallic, and roughness"""
+
+        mat = self.materials.get(name)
+
+        try:
+            if mat is not None and mat.name != name:
+                mat = None
+        except ReferenceError:
+            mat = None
+
+        if mat is None:
+            mat = bpy.data.materials.get(name)
+
+            if mat is None:
+                mat = bpy.data.materials.new(name=name)
+
+            self.materials[name] = mat
+
+        # Only write what differs, the material may already be right
+        if not all(isclose(a, b, abs_tol=0.0001) for a, b in zip(mat.diffuse_color, material_color)):
+            mat.diffuse_color = material_color
+        if not isclose(mat.metallic, metallic, abs_tol=0.0001):
+            mat.metallic = metallic
+        if not isclose(mat.roughness, roughness, abs_tol=0.0001):
+            mat.roughness = roughness
+
+        return mat
+
+    def assign(self, meshes, keys, face_slots=None):
+        """Give each mesh the materials of keys as its material slots, in order;
+        face_slots, one per mesh, is the slot of every face or an array of the
+        slot of each face, set through foreach_set on material_index"""
+
+        materials = [self.get(key) for key in keys]
+
+        for n, mesh in enumerate(meshes):
+            slots = mesh.materials
+
+            # Leave the slots be when already right
+            if len(slots) != len(materials) or any(a != b for a, b in zip(slots, materials)):
+                slots.clear()
+
+                for mat in materials:
+                    slots.append(mat)
+
+            if face_slots is not None:
+                indices = np.broadcast_to(np.asarray(face_slots[n], dtype=np.int32), (len(mesh.polygons),))
+                mesh.polygons.foreach_set("material_index", np.ascontiguousarray(indices))
+                mesh.update()  # foreach_set() doesn't tag the mesh for the viewport
+
+        return materials
+
+
+@bpy.app.handlers.persistent
+def _material_pool_reset(dummy):
+    # pylint: disable=unused-argument
+    if _CVB_MATERIAL_POOL is not None:
+        _CVB_MATERIAL_POOL.clear()
+
+
+def material_pool_register():
+    """Keep the material pool in step with Blender"""
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(_material_pool_reset)
+
+
+def material_pool_unregister():
+    """Stop keeping the material pool"""
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if _material_pool_reset in handlers:
+            handlers.remove(_material_pool_reset)
+
+    _material_pool_reset(None)
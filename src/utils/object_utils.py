@@ -26,6 +26,10 @@
 import bpy
 
 from .collection_utils import collection_tail, collection_objects, path_object
+from .material_utils import material_pool
+
+# What object_select_only() last selected, by name, and in which view layer
+_CVB_SELECTION = {'view_layer': None, 'names': []}
 
 
 def object_add(collection_path, object_name, blender_object):
@@ -48,18 +52,45 @@ def object_add(collection_path, object_name, blender_object):
     return added_object
 
 
+def object_add_many(collection_path, objects_wanted):
+    """Add the objects, given as (name, data), to the collection in one pass"""
+    #
+    # As object_add(), only the collection is found once and the names are
+    # checked against one set of the names taken. An object already added
+    # is returned as is. Returns the objects in the order given.
+    #
+
+    coll = collection_tail(collection_path)
+
+    if coll is None:
+        return []
+
+    taken = set(bpy.data.objects.keys())
+    added_objects = []
+
+    for object_name, blender_object in objects_wanted:
+
+        if object_name in taken:
+            print("Object already added:", object_name)
+            added_objects.append(bpy.data.objects.get(object_name))
+            continue
+
+        added_object = bpy.data.objects.new(object_name, blender_object)
+
+        if added_object:
+            coll.objects.link(added_object)
+            taken.add(object_name)
+
+        added_objects.append(added_object)
+
+    return added_objects
+
+
 def object_add_material(blender_object, material_name, material_color, metallic, roughness):
     """Add a material if it is not found with viewport color, metallic, and roughness"""
-    mat = bpy.data.materials.get(material_name)
-
-    if mat is None:
-        mat = bpy.data.materials.new(name=material_name)
+    mat = material_pool().material(material_name, material_color, metallic, roughness)
 
     if mat is not None:
-        mat.diffuse_color = material_color
-        mat.metallic = metallic
-        mat.roughness = roughness
-
         if blender_object.data.materials:
             # Overwrite first material
             blender_object.data.materials[0] = mat
@@ -95,19 +126,70 @@ def object_get_or_add_empty(collection_path, empty_name, radius=1.0, display_typ
 
 def object_make_active(object_path_and_name):
 
-    # Clear the selections
-    for obj in bpy.data.objects:
-        obj.select_set(False)
-
     obj = object_get(object_path_and_name)
 
+    # Clear the selections, then select and activate the mesh
     if obj and obj.type == 'MESH':
+        object_select_only([obj])
         bpy.context.view_layer.objects.active = obj
-        bpy.context.view_layer.objects.active.select_set(True)
+    else:
+        object_select_only([])
 
     return obj
 
 
+def object_select_only(blender_objects, view_layer=None):
+    """Select only these objects in the view layer (by default the active one),
+    return the objects that were selected before"""
+
+    # Only what is selected is deselected; every object in the file,
+    # tens of thousands in a tile, need not be visited
+    view_layer = view_layer if view_layer is not None else bpy.context.view_layer
+
+    selected_before = list(view_layer.objects.selected)
+
+    for obj in selected_before:
+        obj.select_set(False, view_layer=view_layer)
+
+    selected = [obj for obj in blender_objects if obj]
+
+    for obj in selected:
+        obj.select_set(True, view_layer=view_layer)
+
+    # Remember for object_selection_clear()
+    _CVB_SELECTION['view_layer'] = view_layer.as_pointer()
+    _CVB_SELECTION['names'] = [obj.name for obj in selected]
+
+    return selected_before
+
+
+def object_selection_clear(view_layer=None):
+    """Deselect what object_select_only() last selected, if still selected"""
+
+    view_layer = view_layer if view_layer is not None else bpy.context.view_layer
+
+    if _CVB_SELECTION['view_layer'] != view_layer.as_pointer():
+        return
+
+    for name in _CVB_SELECTION['names']:
+        obj = view_layer.objects.get(name)
+
+        if obj and obj.select_get(view_layer=view_layer):
+            obj.select_set(False, view_layer=view_layer)
+
+    _CVB_SELECTION['names'] = []
+
+
+def object_set_matrices(blender_objects, matrices):
+    """Set the world matrix of each object from an (N, 4, 4) array in one pass,
+    objects that are None are skipped"""
+
+    # One conversion for the whole array, Blender takes the nested lists as is
+    for blender_object, matrix in zip(blender_objects, matrices.tolist()):
+        if blender_object:
+            blender_object.matrix_world = matrix
+
+
 def object_parent_all(blender_object, collection_path_and_name):
     """Parent all child objects found at the path to the Blender object"""
     child_names = collection_objects(collection_path_and_name)
@@ -27,12 +27,205 @@
 # Copyright (c) 2021 Keith Pinson
 
 import re
+import sys
 import json
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
 
 # pylint: disable=too-many-arguments, too-many-instance-attributes, too-many-locals
 
 _CVB_PENDING_NAME = ""
 
+# The Sketch Name grammar, see SketchName.string_to_sketchname(); captures:
+#    city, seed, style, x, y, tile, variant, import_name
+_CVB_SKETCHNAME_REX = re.compile(
+    r"""(?:(?:(\w+?)(?:(?:\#?)([\d]+)))_([a-zA-Z0-9])([^x]+)x([0-9]+M?)(?:(?:\-)([0-9]+))?(?:(?:.)([\d]{3}))?)|(.+)""")
+
+
+@lru_cache(maxsize=16384)
+def _parse_sketchname_groups(sketchname_string):
+    """Return: the Sketch Name string and its components as strings, as
+    stored by SketchName, or None if it fails to parse"""
+
+    # Memoized; the panel parses the same names over and over as it redraws
+    m = _CVB_SKETCHNAME_REX.match(sketchname_string)
+
+    if m is None:
+        return None
+
+    city, seed, style, x, y, tile, variant, import_name = m.groups()
+
+    return (
+        sketchname_string,
+        city,
+        seed,
+        style,
+        x,
+        y,
+        tile if tile is not None else "",
+        variant if variant is not None else 0,
+        import_name if import_name is not None else "")
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class SketchNameRecord(namedtuple(
+        'SketchNameRecord', "sketch_name city seed style x y tile variant import_name")):
+    """A parsed Sketch Name; immutable and hashable, so it can key a dict or set"""
+    #
+    # The fields are typed, unlike those of SketchName: seed, tile and
+    # variant are ints and x, y are in meters. A sketch without a tile
+    # has a tile of -1, as tile 0 is the center tile of a region. An
+    # imported sketch only has its sketch_name and import_name, the
+    # rest are blank, 0 or -1.
+    #
+    # The getters match those of SketchName so either may be passed to
+    # code that only reads a sketch.
+    #
+
+    __slots__ = ()
+
+    def get_sketch_name(self):
+        return self.sketch_name
+
+    def get_plain_sketch_name(self):
+        """Return: the Sketch Name string less the variant"""
+        return self.sketch_name[:-4] if self.variant > 0 else self.sketch_name
+
+    def get_city(self):
+        return self.city
+
+    def get_seed(self):
+        return self.seed
+
+    def get_style(self):
+        return self.style
+
+    def get_x(self):
+        return self.x
+
+    def get_y(self):
+        return self.y
+
+    def get_tile(self):
+        return max(self.tile, 0)  # As SketchName, 0 if there is no tile
+
+    def get_variant(self):
+        return self.variant
+
+    def get_import_name(self):
+        return self.import_name
+
+
+@lru_cache(maxsize=16384)
+def parse_sketchname_string(sketchname_string):
+    """Return: the SketchNameRecord parsed from the Sketch Name string, None if it fails to parse"""
+
+    groups = _parse_sketchname_groups(sketchname_string)
+
+    if groups is None:
+        return None
+
+    _, city, seed, style, x, y, tile, variant, import_name = groups
+
+    # City names repeat across every variant and tile of a city, keep one copy
+    return SketchNameRecord(
+        sketchname_string,
+        sys.intern(city) if city else "",
+        _to_int(seed),
+        style or "",
+        _to_int(convert_km_to_length(x)) if x else 0,
+        _to_int(convert_km_to_length(y)) if y else 0,
+        _to_int(tile, -1),
+        _to_int(variant),
+        import_name)
+
+
+_SKETCHNAME_INT_FIELDS = ('seed', 'x', 'y', 'tile', 'variant')
+
+
+def parse_many(names):
+    """Return: dict of column arrays, one per SketchNameRecord field, parsed
+    from a list of Sketch Name strings; seed, x, y, tile and variant are int64"""
+
+    blank = SketchNameRecord("", "", 0, "", 0, 0, -1, 0, "")
+    records = [parse_sketchname_string(name) or blank._replace(sketch_name=name) for name in names]
+
+    columns = list(zip(*records)) or [()] * len(SketchNameRecord._fields)
+
+    return {
+        field: np.array(column, dtype=np.int64 if field in _SKETCHNAME_INT_FIELDS else object)
+        for field, column in zip(SketchNameRecord._fields, columns)}
+
+
+def build_many(records, ascii_only=False):
+    # pylint: disable=invalid-name
+    """Return: list of Sketch Name strings built from SketchNameRecords or
+    from the columns returned by parse_many(); "" where a record is invalid"""
+    #
+    # The same rules as build_sketchname_string() but with typed fields
+    # (x, y in meters, tile -1 for none) and no _CVB_PENDING_NAME side
+    # effect. City and import names repeat, so each is only formatted once.
+    # A record with a sketch_name was parsed and its city already has its
+    # case; the city may have been edited since, so it is still cleaned
+    # up, but not recased, as "NewYork" would become "Newyork".
+    #
+
+    if isinstance(records, dict):
+        records = zip(*(np.asarray(records[field]).tolist() for field in SketchNameRecord._fields))
+
+    cities, imports, lengths = {}, {}, {}
+    sketch_names = []
+
+    for sketch_name, city, seed, style, x, y, tile, variant, import_name in records:
+
+        if import_name:
+            if import_name not in imports:
+                imports[import_name] = """{name}1_g1x1""".format(name=format_file_name(import_name))
+
+            sketch_names.append(imports[import_name])
+            continue
+
+        parsed = bool(sketch_name)
+        t_city = cities.get((city, parsed))
+
+        if t_city is None:
+            t_city = format_city_name(city, max_length=28, ascii_only=ascii_only, recase=not parsed) if city else ""
+
+            # We'll add a # character if the city name ends in a number
+            if t_city[-1:].isnumeric():
+                t_city = t_city + "#"
+
+            cities[city, parsed] = t_city
+
+        seed, x, y, tile, variant = int(seed), int(x), int(y), int(tile), int(variant)
+
+        if not (t_city and seed > 0 and style and x >= 0 and y >= 0):
+            sketch_names.append("")
+            continue
+
+        for length in (x, y):
+            if length not in lengths:
+                lengths[length] = convert_length_to_km(length)
+
+        sketch_names.append("""{city}{seed}_{style}{x}x{y}{tile}{variant}""".format(
+            city=t_city,
+            seed=seed,
+            style=style[0],
+            x=lengths[x],
+            y=lengths[y],
+            tile="-" + str(tile).zfill(5) if tile >= 0 else "",
+            variant="." + str(variant).zfill(3) if variant > 0 else ""))
+
+    return sketch_names
+
 
 def build_sketchname_string(city, seed, style, x, y, tile="", variant=0, import_name="", ascii_only=False):
     # pylint: disable=invalid-name, too-many-locals
@@ -163,7 +356,7 @@ def convert_length_to_km(length):
     return length_str
 
 
-def format_city_name(city, max_length=100, ascii_only=False):
+def format_city_name(city, max_length=100, ascii_only=False, recase=True):
     # pylint: disable=line-too-long
     """Format the city name string for incorporating into Sketch Name string"""
     #
@@ -171,7 +364,7 @@ def format_city_name(city, max_length=100, ascii_only=False):
     #
     #   1) Be filename compatible
     #   2) Must not contain an underscore, "_"
-    #   3) Each word must be capitalized
+    #   3) Each word must be capitalized, unless recase is False
     #   4) All space must be removed
     #   5) Not be quoted
     #
@@ -184,7 +377,7 @@ def format_city_name(city, max_length=100, ascii_only=False):
         t_city = t_city.strip("""\'""")
 
         # Remove <>:"/\|?* and _
-        t_city = format_file_name(t_city)  # Underscore is reserved as a delimiter in the sketchname
+        t_city = format_file_name(t_city, recase=recase)  # Underscore is reserved as a delimiter in the sketchname
 
         # Truncate the city name to an arbitrary number of characters
         if len(t_city) > max_length:
@@ -202,9 +395,10 @@ def format_city_name(city, max_length=100, ascii_only=False):
     return t_city
 
 
-def format_file_name(file_name):
+def format_file_name(file_name, recase=True):
     """Format the string so that it is valid file format and to
-       avoid confusion make it sketchname compatible too."""
+       avoid confusion make it sketchname compatible too; recase
+       False keeps the case of each word as it is."""
 
     try:
         t_file_name = file_name
@@ -217,7 +411,8 @@ def format_file_name(file_name):
         t_file_name = t_file_name.replace("_", " ")
 
         # Capitalize words and remove spaces
-        t_file_name = t_file_name.title()  # Make sure to remove underscores before calling this
+        if recase:
+            t_file_name = t_file_name.title()  # Make sure to remove underscores before calling this
         t_file_name = t_file_name.replace(" ", "")
 
     except TypeError:
@@ -344,7 +539,7 @@ class SketchName:
         #
         # Can confirm on regex101.com
         #
-        # /(?:(?:(\w+)(?:(?:\#?)([\d]+)))_([a-zA-Z0-9])([^x]+)x([0-9]+M?)(?:(?:\-)([0-9]+))?(?:(?:.)([\d]{3}))?)|(.+)/gm
+        # /(?:(?:(\w+?)(?:(?:\#?)([\d]+)))_([a-zA-Z0-9])([^x]+)x([0-9]+M?)(?:(?:\-)([0-9]+))?(?:(?:.)([\d]{3}))?)|(.+)/gm
         #
         # City1_g1x1
         # City1_g10x20
@@ -359,24 +554,12 @@ class SketchName:
         # Motown
         #
 
-        # Regex that captures the format as described above, resulting in:
-        #    city, seed, style, x, y, tile, variant
-        rex = r"""(?:(?:(\w+)(?:(?:\#?)([\d]+)))_([a-zA-Z0-9])([^x]+)x([0-9]+M?)(?:(?:\-)([0-9]+))?(?:(?:.)([\d]{3}))?)|(.+)"""
-
-        m = re.match(rex, sketchname_string)
-
-        if m is not None:
-            city, seed, style, x, y, tile, variant, import_name = m.groups()
+        # The regex, _CVB_SKETCHNAME_REX, captures the format as described above
+        groups = _parse_sketchname_groups(sketchname_string)
 
-            self.sketch_name = sketchname_string
-            self.city = city
-            self.seed = seed
-            self.style = style
-            self.x = x
-            self.y = y
-            self.tile = tile if tile is not None else ""
-            self.variant = variant if variant is not None else 0
-            self.import_name = import_name if import_name is not None else ""
+        if groups is not None:
+            (self.sketch_name, self.city, self.seed, self.style, self.x, self.y,
+             self.tile, self.variant, self.import_name) = groups
 
     def sketchname_string(self):
         """Extract the Sketch Name string and return it"""
@@ -0,0 +1,87 @@
+"""Import the add-on's modules outside of Blender for testing"""
+#
+# The add-on's modules import bpy. Outside of Blender there is none to
+# import (the fake-bpy-module only installs type stubs), so a minimal
+# stand-in is put in its place, just enough to import the modules that
+# are tested. There are no add-on preferences outside of Blender either,
+# so cvb_prefs() is swapped for one that finds none and the defaults are
+# used; that also keeps fassGrid from reading or writing its table cache.
+#
+# Usage, as the first import of a test:
+#
+#     from cvb_test_setup import fass_grid, curve_engines
+#
+# Copyright (c) 2021 Keith Pinson
+
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def _stub_bpy():
+    """Put a stand-in bpy in sys.modules, enough to import the add-on's modules"""
+
+    def _property(*args, **kwargs):
+        # pylint: disable=unused-argument
+        return None
+
+    def _nothing(*args, **kwargs):
+        # pylint: disable=unused-argument
+        return None
+
+    bpy = types.ModuleType("bpy")
+
+    bpy.types = types.ModuleType("bpy.types")
+    for name in ("AddonPreferences", "Object", "Operator", "Panel", "PropertyGroup"):
+        setattr(bpy.types, name, type(name, (), {}))
+
+    bpy.props = types.ModuleType("bpy.props")
+    for name in ("BoolProperty", "EnumProperty", "FloatProperty", "IntProperty",
+                 "PointerProperty", "StringProperty"):
+        setattr(bpy.props, name, _property)
+
+    bpy.app = types.SimpleNamespace(
+        handlers=types.SimpleNamespace(
+            persistent=lambda func: func,
+            depsgraph_update_post=[], load_post=[], undo_post=[], redo_post=[]),
+        timers=types.SimpleNamespace(
+            register=_nothing, unregister=_nothing, is_registered=lambda func: False),
+        driver_namespace={})
+
+    bpy.utils = types.ModuleType("bpy.utils")
+    bpy.utils.register_class = bpy.utils.unregister_class = _nothing
+    bpy.utils.previews = types.ModuleType("bpy.utils.previews")
+    bpy.utils.previews.new = dict
+    bpy.utils.previews.remove = _nothing
+
+    bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+    bpy.context = None
+    bpy.data = None
+
+    sys.modules.update({
+        "bpy": bpy, "bpy.types": bpy.types, "bpy.props": bpy.props,
+        "bpy.utils": bpy.utils, "bpy.utils.previews": bpy.utils.previews})
+
+
+try:
+    import bpy  # pylint: disable=unused-import
+except ImportError:
+    _stub_bpy()
+
+# pylint: disable=wrong-import-position
+from src.addon import preferences
+from src.utils import fass_grid, curve_engines, sketchname_parse, collection_utils
+
+
+def _no_prefs(context):
+    # pylint: disable=unused-argument
+    return None
+
+
+preferences.cvb_prefs = _no_prefs
+fass_grid.cvb_prefs = _no_prefs
@@ -0,0 +1,174 @@
+"""Check the collection snapshots, their diffs and removing a collection"""
+#
+# Outside of Blender there are no collections, so the tree is built of
+# stand-ins with just what a snapshot or a remove reads: a name,
+# children, objects, users and a pointer.
+#
+# Run from the root of the repository:
+#
+#     python -m unittest discover -s tests
+#
+# Copyright (c) 2021 Keith Pinson
+
+import itertools
+import unittest
+from unittest import mock
+
+from cvb_test_setup import collection_utils
+
+_POINTERS = itertools.count(1000)
+
+
+class _Collection:
+    """Stand-in for a bpy.types.Collection"""
+
+    def __init__(self, name, children=(), objects=0):
+        self.name = name
+        self.children = list(children)
+        self.objects = [object()] * objects
+        self.pointer = next(_POINTERS)
+        self.users = 1
+
+    def as_pointer(self):
+        return self.pointer
+
+
+class _Object:
+    """Stand-in for a mesh bpy.types.Object"""
+
+    def __init__(self, mesh, *collections):
+        self.type = 'MESH'
+        self.data = mesh
+        self.users_collection = collections
+
+        for coll in collections:
+            coll.objects.append(self)
+
+
+class _Mesh:
+    """Stand-in for a bpy.types.Mesh"""
+
+    def __init__(self, users=1):
+        self.users = users
+
+
+def _sketch(name):
+    return _Collection(name, [
+        _Collection("Sketch ~ " + name, objects=1),
+        _Collection("City ~ " + name, [_Collection("Tour ~ " + name)], objects=3)])
+
+
+class TestCollectionSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.cvb = _Collection("CVB", [_sketch("Paris1_g1x1"), _sketch("Lyon2_g1x1")])
+
+        patcher = mock.patch.object(collection_utils, "_walk_path", lambda path_string: self.cvb)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        collection_utils.collection_index_clear()
+        self.addCleanup(collection_utils.collection_index_clear)
+
+    def diff(self, before):
+        return collection_utils.collection_snapshot_diff(before, collection_utils.collection_snapshot())
+
+    def test_snapshot(self):
+        snapshot = collection_utils.collection_snapshot()
+
+        # Parents before their children, in the order of the tree
+        self.assertEqual([path for path, *_ in snapshot], [
+            (), ("Paris1_g1x1",), ("Paris1_g1x1", "Sketch ~ Paris1_g1x1"), ("Paris1_g1x1", "City ~ Paris1_g1x1"),
+            ("Paris1_g1x1", "City ~ Paris1_g1x1", "Tour ~ Paris1_g1x1"),
+            ("Lyon2_g1x1",), ("Lyon2_g1x1", "Sketch ~ Lyon2_g1x1"), ("Lyon2_g1x1", "City ~ Lyon2_g1x1"),
+            ("Lyon2_g1x1", "City ~ Lyon2_g1x1", "Tour ~ Lyon2_g1x1")])
+        self.assertEqual(snapshot[0][1:], (self.cvb.as_pointer(), 2, 0))
+
+    def test_identical(self):
+        before = collection_utils.collection_snapshot()
+
+        self.assertEqual(collection_utils.collection_snapshot(), before)
+        self.assertEqual(self.diff(before), {'added': [], 'removed': [], 'renamed': [], 'changed': []})
+
+    def test_added(self):
+        before = collection_utils.collection_snapshot()
+        self.cvb.children.append(_sketch("Nice3_g1x1"))
+
+        self.assertEqual(self.diff(before), {'added': ["Nice3_g1x1"], 'removed': [], 'renamed': [], 'changed': []})
+
+    def test_removed(self):
+        before = collection_utils.collection_snapshot()
+        del self.cvb.children[0]
+
+        self.assertEqual(self.diff(before), {'added': [], 'removed': ["Paris1_g1x1"], 'renamed': [], 'changed': []})
+
+    def test_renamed(self):
+        before = collection_utils.collection_snapshot()
+        self.cvb.children[1].name = "Lyon2_g1x1.001"
+
+        # Not a remove and an add, the collection is the same one
+        self.assertEqual(self.diff(before), {
+            'added': [], 'removed': [], 'renamed': [("Lyon2_g1x1", "Lyon2_g1x1.001")], 'changed': []})
+
+    def test_changed(self):
+        before = collection_utils.collection_snapshot()
+        self.cvb.children[0].children[1].children[0].objects.append(object())
+
+        self.assertEqual(self.diff(before), {'added': [], 'removed': [], 'renamed': [], 'changed': ["Paris1_g1x1"]})
+
+    def test_no_collection(self):
+        self.cvb = None
+
+        self.assertEqual(collection_utils.collection_snapshot(), ())
+        self.assertEqual(collection_utils.collection_snapshot_diff((), ()),
+                         {'added': [], 'removed': [], 'renamed': [], 'changed': []})
+
+
+class TestCollectionRemove(unittest.TestCase):
+
+    def setUp(self):
+        # /CVB/Paris1_g1x1 holds City, which holds Tour and Props; Props is also
+        # linked to Shared outside, which in turn holds Trees
+        self.tour, self.trees = _Collection("Tour"), _Collection("Trees")
+        self.props = _Collection("Props", [self.trees])
+        self.city = _Collection("City", [self.tour, self.props])
+        self.sketch = _Collection("Paris1_g1x1", [self.city])
+        self.shared = _Collection("Shared", [self.props])
+        self.props.users = 2
+
+        self.removed = []
+        data = mock.Mock(batch_remove=self.removed.extend)
+
+        for patcher in (mock.patch.object(collection_utils, "_walk_path", lambda path_string: self.sketch),
+                        mock.patch.object(collection_utils.bpy, "data", data, create=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        collection_utils.collection_index_clear()
+        self.addCleanup(collection_utils.collection_index_clear)
+
+    def test_keeps_collections_linked_outside(self):
+        mesh, shared_mesh = _Mesh(), _Mesh(users=2)
+        tour_obj = _Object(mesh, self.tour)
+        tree = _Object(_Mesh(), self.trees)
+        city_obj = _Object(shared_mesh, self.city)
+        both = _Object(_Mesh(), self.tour, self.props)
+        _Object(shared_mesh, self.shared)
+
+        counts = collection_utils.collection_remove("/CVB/Paris1_g1x1")
+
+        self.assertEqual(counts, {'collections': 3, 'objects': 2, 'meshes': 1, 'kept': 2})
+        # The shared mesh has a user outside, and Props keeps Trees and both objects
+        self.assertEqual(set(self.removed), {self.sketch, self.city, self.tour, tour_obj, city_obj, mesh})
+        self.assertNotIn(self.props, self.removed)
+        self.assertNotIn(tree, self.removed)
+        self.assertNotIn(both, self.removed)
+
+    def test_root_is_not_removed(self):
+        self.assertEqual(collection_utils.collection_remove("/CVB"),
+                         {'collections': 0, 'objects': 0, 'meshes': 0, 'kept': 0})
+        self.assertEqual(self.removed, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+"""Check the neighborhood queries and tile matrices of every curve engine"""
+#
+# The neighbor, rectangle and ring queries look positions up in the
+# xy-to-tile table. Here each answer is checked against the tile-to-xy
+# table instead, by going over every tile of the region.
+#
+# Tile matrices are checked by finding their tiles again from points
+# in meters, scattered within each tile.
+#
+# Run from the root of the repository:
+#
+#     python -m unittest discover -s tests
+#
+# Copyright (c) 2021 Keith Pinson
+
+import unittest
+
+import numpy as np
+
+from cvb_test_setup import fass_grid, curve_engines
+
+_ORDERS = (1, 2, 3, 4, 11)
+_ENGINES = (fass_grid.fassGrid, curve_engines.HilbertCurve, curve_engines.ZOrderCurve,
+            curve_engines.SquareSpiralCurve)
+
+_SIDES = ((0, -1), (1, 0), (0, 1), (-1, 0))
+_CORNERS = ((1, -1), (1, 1), (-1, 1), (-1, -1))
+
+
+def _grids():
+    for engine in _ENGINES:
+        for order in _ORDERS:
+            yield engine.__name__, order, engine(order)
+
+
+def _in_rect(grid, left, top, right, bottom):
+    """Return: sorted array of the tiles from left, top to right, bottom inclusive, by brute force"""
+
+    xy = grid.get_tile_to_xy_table()
+    inside = (xy[:, 0] >= left) & (xy[:, 0] <= right) & (xy[:, 1] >= top) & (xy[:, 1] <= bottom)
+
+    return np.flatnonzero(inside)
+
+
+class TestNeighborhood(unittest.TestCase):
+
+    def test_neighbors(self):
+        for name, order, grid in _grids():
+            with self.subTest(engine=name, order=order):
+                last = grid.get_last_tile()
+                tiles = {tuple(xy): tile_id for tile_id, xy in enumerate(grid.get_tile_to_xy_table().tolist())}
+
+                for diagonal, steps in ((False, _SIDES), (True, _SIDES + _CORNERS)):
+                    neighbors = {tile_id: grid.get_tile_neighbors(tile_id, diagonal).tolist()
+                                 for tile_id in range(last + 1)}
+
+                    for tile_id, tile_neighbors in neighbors.items():
+                        self.assertEqual(tile_neighbors, sorted(set(tile_neighbors)))
+                        self.assertTrue(all(0 <= n <= last and n != tile_id for n in tile_neighbors))
+
+                        # Neighbors are each other's neighbors
+                        for n in tile_neighbors:
+                            self.assertIn(tile_id, neighbors[n])
+
+                        x, y = grid.get_tile_xy(tile_id)
+                        expected = sorted(tiles[x + dx, y + dy] for dx, dy in steps if (x + dx, y + dy) in tiles)
+                        self.assertEqual(tile_neighbors, expected)
+
+    def test_neighbors_many(self):
+        for name, order, grid in _grids():
+            with self.subTest(engine=name, order=order):
+                tile_ids = np.arange(grid.get_last_tile() + 1)
+
+                for diagonal in (False, True):
+                    many = grid.get_tile_neighbors_many(tile_ids, diagonal)
+
+                    for tile_id, row in zip(tile_ids.tolist(), many):
+                        self.assertEqual(np.sort(row[row >= 0]).tolist(),
+                                         grid.get_tile_neighbors(tile_id, diagonal).tolist())
+
+    def test_rect(self):
+        rng = np.random.default_rng(5)
+
+        for name, order, grid in _grids():
+            with self.subTest(engine=name, order=order):
+                left, top, right, bottom = grid.get_grid_corners()
+
+                # Rectangles inside, overlapping and clear of the region, and empty ones
+                for x0, y0, x1, y1 in rng.integers((left - 4, top - 4, left - 4, top - 4),
+                                                   (right + 5, bottom + 5, right + 5, bottom + 5), (50, 4)):
+                    np.testing.assert_array_equal(grid.get_tile_ids_in_rect(x0, y0, x1, y1),
+                                                  _in_rect(grid, x0, y0, x1, y1))
+
+                np.testing.assert_array_equal(grid.get_tile_ids_in_rect(left, top, right, bottom),
+                                              np.arange(grid.get_last_tile() + 1))
+
+    def test_ring(self):
+        for name, order, grid in _grids():
+            with self.subTest(engine=name, order=order):
+                left, top, right, bottom = grid.get_grid_corners()
+                side = right - left + 1
+
+                for k in (1, 2):
+                    for x, y in ((left, top), (right, top), (left, bottom), (right, bottom),
+                                 (left, (top + bottom) // 2), ((left + right) // 2, bottom)):
+                        tile_id = grid.get_tile_id(x, y)
+                        ring = grid.get_tile_ring(tile_id, k)
+
+                        # Cut off by the edges of the region on one side or two
+                        width = min(x - left, k) + min(right - x, k) + 1
+                        height = min(y - top, k) + min(bottom - y, k) + 1
+                        self.assertEqual(len(ring), min(width, side) * min(height, side))
+
+                        self.assertIn(tile_id, ring.tolist())
+                        np.testing.assert_array_equal(ring, _in_rect(grid, x - k, y - k, x + k, y + k))
+
+
+class TestTileMatrices(unittest.TestCase):
+
+    def test_points_round_trip(self):
+        rng = np.random.default_rng(10)
+
+        for name, order, grid in _grids():
+            with self.subTest(engine=name, order=order):
+                tile_ids = np.arange(grid.get_last_tile() + 1)
+
+                for tile_size in (1000.0, (250.0, 40.0)):
+                    size = np.broadcast_to(np.asarray(tile_size), (2,))
+                    matrices = grid.get_tile_matrices(tile_ids, tile_size)
+
+                    # Blender's y counts up where the tiles count down
+                    xs, ys = grid.get_tile_xy_many(tile_ids)
+                    np.testing.assert_array_equal(matrices[:, :2, 3], np.stack((xs, -ys), axis=-1) * size)
+
+                    # Anywhere within a tile finds that tile, and how far off its center
+                    offsets = rng.uniform(-0.49, 0.49, (len(tile_ids), 2)) * size
+                    found, found_offsets = grid.get_tile_id_for_points(matrices[:, :2, 3] + offsets, tile_size)
+
+                    np.testing.assert_array_equal(found, tile_ids)
+                    np.testing.assert_allclose(found_offsets, offsets, atol=1e-6)
+
+    def test_points_off_the_grid(self):
+        for name, order, grid in _grids():
+            with self.subTest(engine=name, order=order):
+                left, top, right, bottom = grid.get_grid_corners()
+
+                # Just past each edge of the region, in meters; y flipped
+                points = np.array(((left - 1, top), (right + 1, top), (left, top - 1), (left, bottom + 1),
+                                   (right + 5, bottom + 5))) * (1000.0, -1000.0)
+                found, _ = grid.get_tile_id_for_points(points)
+
+                np.testing.assert_array_equal(found, -1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+"""Check fassGrid's tables against the FASS definition at every region order"""
+#
+# The tables of fassGrid are built in bulk with numpy. Here every tile is
+# placed again, one at a time, straight from the definition: the sectors
+# spiral out from the center, X at the center then R/r and Q/q sides in
+# turn, and within each sector the tiles follow the @X, @Q or @R curve,
+# walked from its string of turns and steps (q and r are Q and R turned
+# half way round). The batch lookups read the same tables, so checking
+# the tables checks them too.
+#
+# Run from the root of the repository:
+#
+#     python -m unittest discover -s tests
+#
+# Copyright (c) 2021 Keith Pinson
+
+import unittest
+
+import numpy as np
+
+# pylint: disable=protected-access
+from cvb_test_setup import fass_grid
+
+_ORDERS = range(1, 36)
+_WIDTH = 9
+
+# N, E, S, W; a "-" turns clockwise, a "+" counterclockwise
+_HEADINGS = "NESW"
+_STEPS = {'N': (0, -1), 'E': (1, 0), 'S': (0, 1), 'W': (-1, 0)}
+
+
+def _turn(heading, leftright):
+    return _HEADINGS[(_HEADINGS.index(heading) + (1 if leftright == '-' else -1)) % 4]
+
+
+def _step(position, heading):
+    return position[0] + _STEPS[heading][0], position[1] + _STEPS[heading][1]
+
+
+def _walk_curve(fass_string, heading):
+    """Return: list of the x, y of each tile along a FASS curve string"""
+
+    position = (0, 0)
+    tiles = [position]
+
+    for k in fass_string:
+        if k in "+-":
+            heading = _turn(heading, k)
+        elif k == '>':
+            position = _step(position, heading)
+            tiles.append(position)
+
+    return tiles
+
+
+def _walk_sectors(order):
+    """Return: list of the x, y and letter of each sector along the spiral"""
+
+    position, heading = _step((0, 0), 'N'), 'E'
+    sectors = [((0, 0), 'X')]
+
+    for i in range(1, order):
+        for j in range(i + 1):
+            sectors.append((position, "r" if i % 2 == 0 else "R"))
+
+            if j == i:
+                heading = _turn(heading, '-')
+
+            position = _step(position, heading)
+
+        for _ in range(i):
+            sectors.append((position, "Q" if i % 2 == 0 else "q"))
+            position = _step(position, heading)
+
+        heading = _turn(heading, '-')
+
+    return sectors
+
+
+def _walk_tiles(order):
+    """Return: list of the x, y of every tile of the region, by tile id"""
+
+    curves = {
+        'X': _walk_curve(fass_grid.fassGrid._atX, 'E'),
+        'Q': _walk_curve(fass_grid.fassGrid._atQ, 'N'),
+        'R': _walk_curve(fass_grid.fassGrid._atR, 'E')}
+
+    half = int(_WIDTH / 2)
+    tiles = []
+
+    for (sector_x, sector_y), letter in _walk_sectors(order):
+        for x, y in curves[letter.upper()]:
+            if letter == 'X':
+                tiles.append((x, y))
+            elif letter.isupper():
+                tiles.append((x + _WIDTH * sector_x - half, y + _WIDTH * sector_y + half))
+            else:
+                tiles.append((-x + _WIDTH * sector_x + half, -y + _WIDTH * sector_y - half))
+
+    return tiles
+
+
+class TestFassGrid(unittest.TestCase):
+
+    def test_curves_cover_a_sector(self):
+        for curve, heading in ((fass_grid.fassGrid._atX, 'E'),
+                               (fass_grid.fassGrid._atQ, 'N'),
+                               (fass_grid.fassGrid._atR, 'E')):
+            tiles = _walk_curve(curve, heading)
+            self.assertEqual(len(tiles), _WIDTH**2)
+            self.assertEqual(len(set(tiles)), _WIDTH**2)
+
+    def test_tile_to_xy(self):
+        for order in _ORDERS:
+            with self.subTest(order=order):
+                grid = fass_grid.fassGrid(order)
+                expected = np.array(_walk_tiles(order))
+
+                self.assertEqual(len(expected), (order * _WIDTH)**2)
+                self.assertEqual(tuple(expected[0]), (0, 0))
+                np.testing.assert_array_equal(grid._tile_to_xy, expected)
+
+    def test_xy_to_tile(self):
+        for order in _ORDERS:
+            with self.subTest(order=order):
+                grid = fass_grid.fassGrid(order)
+                tiles = np.array(_walk_tiles(order))
+                ids = np.arange(len(tiles))
+
+                # Every tile is found where it was placed, and nothing else is found
+                cells = tiles - grid._xy_to_tile_offset
+                np.testing.assert_array_equal(grid._xy_to_tile[cells[:, 0], cells[:, 1]], ids)
+                self.assertEqual(int((grid._xy_to_tile >= 0).sum()), len(tiles))
+
+                np.testing.assert_array_equal(grid.get_tile_id_many(tiles[:, 0], tiles[:, 1]), ids)
+
+    def test_tile_id_round_trip(self):
+        # Before the tables were made the exact inverse of the walk, an
+        # even order raised KeyError for tiles off the centered square
+        for order in _ORDERS:
+            with self.subTest(order=order):
+                grid = fass_grid.fassGrid(order)
+
+                for tile_id in range(len(grid._tile_to_xy)):
+                    self.assertEqual(grid.get_tile_id(*grid.get_tile_xy(tile_id)), tile_id)
+
+    def test_tile_xy_many(self):
+        for order in _ORDERS:
+            with self.subTest(order=order):
+                grid = fass_grid.fassGrid(order)
+                last = grid.get_last_tile()
+
+                # Ids off either end land on the first tile, as they do one at a time
+                tile_ids = np.concatenate((np.arange(-3, 0), np.arange(last + 1), np.arange(last + 1, last + 4)))
+                xs, ys = grid.get_tile_xy_many(tile_ids)
+
+                self.assertEqual(list(zip(xs.tolist(), ys.tolist())),
+                                 [grid.get_tile_xy(int(tile_id)) for tile_id in tile_ids])
+
+    def test_tile_id_many(self):
+        for order in _ORDERS:
+            with self.subTest(order=order):
+                grid = fass_grid.fassGrid(order)
+                left, top, right, bottom = grid.get_grid_corners()
+
+                # Every position of the region and a border of two around it; off
+                # the region, x and y are clamped to the region as they are one at a time
+                xs, ys = np.meshgrid(np.arange(left - 2, right + 3), np.arange(top - 2, bottom + 3), indexing='ij')
+                xs, ys = xs.ravel(), ys.ravel()
+                tile_ids = grid.get_tile_id_many(xs, ys)
+
+                for x, y, tile_id in zip(xs.tolist(), ys.tolist(), tile_ids.tolist()):
+                    if tile_id < 0:
+                        with self.assertRaises(KeyError):
+                            grid.get_tile_id(x, y)
+                    else:
+                        self.assertEqual(grid.get_tile_id(x, y), tile_id)
+
+                self.assertTrue(((tile_ids >= -1) & (tile_ids <= grid.get_last_tile())).all())
+
+    def test_iter_tiles(self):
+        for order in _ORDERS:
+            with self.subTest(order=order):
+                grid = fass_grid.fassGrid(order)
+                sectors = _walk_sectors(order)
+                tile_ids = []
+
+                for chunk in (1000, 7):
+                    for ids, xs, ys, sector_ids, letters in grid.iter_tiles(chunk=chunk):
+                        self.assertLessEqual(len(ids), chunk)
+                        np.testing.assert_array_equal(np.stack((xs, ys), axis=-1), grid._tile_to_xy[ids])
+                        self.assertEqual(letters.tolist(), [sectors[s][1] for s in sector_ids.tolist()])
+
+                        if chunk == 1000:
+                            tile_ids.extend(ids.tolist())
+
+                # Every tile once, in curve order
+                self.assertEqual(tile_ids, list(range(len(grid._tile_to_xy))))
+
+                part = np.concatenate([ids for ids, *_ in grid.iter_tiles(start=-5, stop=100, chunk=30)])
+                np.testing.assert_array_equal(part, np.arange(min(100, len(grid._tile_to_xy))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Check that Sketch Name strings parse into records and build back again"""
+#
+# Run from the root of the repository:
+#
+#     python -m unittest discover -s tests
+#
+# Copyright (c) 2021 Keith Pinson
+
+import unittest
+
+from cvb_test_setup import sketchname_parse
+
+# Each form of Sketch Name the panel sees: with and without a tile, a
+# variant, a city ending in a number, and lengths in meters
+_NAMES = (
+    "NewYork12_g1x1.004",
+    "TauCeti5#7_g30Mx30M-00042.002",
+    "Motown3_m10x20-00000",
+    "Paris1_g2x3",
+    "Lyon2_g1x1-01234",
+    "SanFrancisco473_s5x5-00012.001")
+
+
+class TestSketchNameRecords(unittest.TestCase):
+
+    def test_parse_build_identity(self):
+        records = [sketchname_parse.parse_sketchname_string(name) for name in _NAMES]
+
+        self.assertEqual(sketchname_parse.build_many(records), list(_NAMES))
+        self.assertEqual(sketchname_parse.build_many(sketchname_parse.parse_many(_NAMES)), list(_NAMES))
+
+    def test_record_fields(self):
+        record = sketchname_parse.parse_sketchname_string("TauCeti5#7_g30Mx30M-00042.002")
+
+        self.assertEqual(record, sketchname_parse.SketchNameRecord(
+            "TauCeti5#7_g30Mx30M-00042.002", "TauCeti5", 7, "g", 30, 30, 42, 2, ""))
+        self.assertEqual(record.get_plain_sketch_name(), "TauCeti5#7_g30Mx30M-00042")
+
+    def test_no_tile(self):
+        # Tile 0 is the center tile of a region, so no tile is -1
+        for name in ("NewYork12_g1x1.004", "Paris1_g2x3"):
+            record = sketchname_parse.parse_sketchname_string(name)
+
+            self.assertEqual(record.tile, -1)
+            self.assertEqual(record.get_tile(), 0)
+
+        self.assertEqual(sketchname_parse.parse_sketchname_string("Motown3_m10x20-00000").tile, 0)
+        self.assertEqual(sketchname_parse.parse_many(_NAMES)['tile'].tolist(), [-1, 42, 0, -1, 1234, 12])
+
+    def test_edited_city(self):
+        columns = sketchname_parse.parse_many(["SanFrancisco473_g1x1.002", "NewYork12_g1x1.004"])
+        columns['city'][0] = "san francisco_bay"
+        columns['city'][1] = '"New York/Manhattan?"'
+
+        # Cleaned up so the name parses again, but not recased
+        built = sketchname_parse.build_many(columns)
+        self.assertEqual(built, ["sanfranciscobay473_g1x1.002", "NewYorkManhattan12_g1x1.004"])
+
+        for name, city in zip(built, ("sanfranciscobay", "NewYorkManhattan")):
+            self.assertEqual(sketchname_parse.parse_sketchname_string(name).city, city)
+
+    def test_new_records(self):
+        # Typed in, not parsed, so the city is recased
+        records = [
+            sketchname_parse.SketchNameRecord("", "new york", 3, "medieval", 1000, 2000, -1, 0, ""),
+            sketchname_parse.SketchNameRecord("", "tau ceti 5", 7, "grid", 30, 30, 42, 2, ""),
+            sketchname_parse.SketchNameRecord("", "new york", 0, "medieval", 1000, 2000, -1, 0, "")]
+
+        self.assertEqual(sketchname_parse.build_many(records),
+                         ["NewYork3_m1x2", "TauCeti5#7_g30Mx30M-00042.002", ""])
+
+    def test_import(self):
+        record = sketchname_parse.parse_sketchname_string("Import7")
+
+        self.assertEqual((record.import_name, record.city, record.tile), ("Import7", "", -1))
+        self.assertEqual(sketchname_parse.build_many([record]), ["Import71_g1x1"])
+
+
+if __name__ == "__main__":
+    unittest.main()